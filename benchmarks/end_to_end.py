@@ -0,0 +1,266 @@
+"""
+Measure what users wait for: cloning, building and installing private packages with pip_install_privates.
+
+Usage: python -m benchmarks.end_to_end [--private N] [--public N] [--install-args ARGS] [--json FILE] [--keep]
+
+Everything runs offline. Fake private packages live in local bare git repositories, which git reaches through
+url.<base>.insteadOf rules for https://github.com/ and https://gitlab.com/, so the requirements still use the GitHub
+and GitLab URLs that pip_install_privates rewrites. Public packages are served from a directory based PEP 503 index.
+install() runs twice in throwaway virtualenvs: cold with empty caches, and warm with the caches of the cold run.
+The time of every run is divided over its phases (clone, build, install, ...) using the timestamps in pip's log.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+import venv
+from contextlib import contextmanager
+from datetime import datetime
+
+from benchmarks import fake_backend
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PYPROJECT = """[build-system]
+requires = []
+build-backend = "fake_backend"
+backend-path = ["."]
+"""
+
+GIT_ENVIRONMENT = dict(
+    GIT_AUTHOR_NAME="Benchmark",
+    GIT_AUTHOR_EMAIL="benchmark@example.com",
+    GIT_COMMITTER_NAME="Benchmark",
+    GIT_COMMITTER_EMAIL="benchmark@example.com",
+    GIT_CONFIG_NOSYSTEM="1",
+)
+
+# pip log lines that start a phase, a phase lasts until a line of another phase is logged
+PHASE_MARKERS = (
+    ("clone", ("Cloning ", "Running command git clone")),
+    ("build", ("Getting requirements to build", "Preparing metadata", "Building wheel")),
+    ("install", ("Installing collected packages",)),
+    ("resolve", ("Collecting ", "Processing ", "Requirement already satisfied")),
+)
+
+
+@contextmanager
+def phase(timings, name):
+    """
+    Measure the wall time of a phase of the benchmark.
+    :param timings: The dict to store the time in seconds in, under the name of the phase.
+    :param name: The name of the phase.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+        print(f"{name:24} {timings[name]:8.2f} s")
+
+
+def git(*args, cwd=None):
+    subprocess.check_call(
+        ["git"] + list(args), cwd=cwd, env=dict(os.environ, **GIT_ENVIRONMENT)
+    )
+
+
+def create_index(directory, packages):
+    """
+    Create a PEP 503 simple index in a directory, with a single wheel per package.
+    :param directory: The directory of the index.
+    :param packages: A list of tuples of the name, version and dependencies of every package.
+    """
+    for name, version, dependencies in packages:
+        project = os.path.join(directory, name)
+        os.makedirs(project)
+        wheel = fake_backend.write_wheel(project, name, version, dependencies)
+        with open(os.path.join(project, wheel), "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with open(os.path.join(project, "index.html"), "w") as f:
+            f.write(f'<html><body><a href="{wheel}#sha256={digest}">{wheel}</a></body></html>\n')
+
+
+def create_repository(directory, name, version, dependencies):
+    """
+    Create a bare git repository of a package that is built with fake_backend, with a tag for its version.
+    :param directory: The path of the bare repository.
+    :param name: The name of the package.
+    :param version: The version of the package.
+    :param dependencies: Requirement strings of the dependencies of the package.
+    """
+    work = f"{directory}.work"
+    os.makedirs(work)
+    with open(os.path.join(work, "pyproject.toml"), "w") as f:
+        f.write(PYPROJECT)
+    with open(os.path.join(work, "package.json"), "w") as f:
+        json.dump({"name": name, "version": version, "dependencies": dependencies}, f)
+    shutil.copy(fake_backend.__file__, os.path.join(work, "fake_backend.py"))
+    git("init", "--quiet", "--initial-branch=main", work)
+    git("add", "--all", cwd=work)
+    git("commit", "--quiet", "-m", f"Release {version}", cwd=work)
+    git("tag", f"v{version}", cwd=work)
+    git("clone", "--quiet", "--bare", work, directory)
+    shutil.rmtree(work)
+
+
+def create_fixtures(workspace, private, public):
+    """
+    Create the repositories, the index and the requirements file for a benchmark run.
+    :param workspace: The directory to create everything in.
+    :param private: The number of private packages, half of which are hosted on GitHub and half on GitLab.
+    :param public: The number of public packages.
+    :return: The path to the requirements file.
+    """
+    public_packages = [(f"public-{i}", "1.0", []) for i in range(public)]
+    create_index(os.path.join(workspace, "index"), public_packages)
+
+    requirements = [f"{name}=={version}" for name, version, _ in public_packages[::2]]
+    for i in range(private):
+        host = "github.com" if i % 2 == 0 else "gitlab.com"
+        name = f"private-{i}"
+        dependencies = [
+            f"public-{(i + offset) % public}" for offset in range(2) if public
+        ]
+        create_repository(
+            os.path.join(workspace, "repositories", host, "FakeOrg", f"{name}.git"),
+            name,
+            "1.0",
+            dependencies,
+        )
+        requirements.append(f"git+git@{host}:FakeOrg/{name}.git@v1.0#egg={name}")
+
+    # Let git fetch the URLs pip_install_privates produces from the local repositories
+    gitconfig = os.path.join(workspace, "gitconfig")
+    for host in ("github.com", "gitlab.com"):
+        git(
+            "config", "--file", gitconfig, "--add",
+            f"url.file://{os.path.join(workspace, 'repositories', host)}/.insteadOf",
+            f"https://{host}/",
+        )
+
+    fname = os.path.join(workspace, "requirements.txt")
+    with open(fname, "w") as f:
+        f.write("\n".join(requirements) + "\n")
+    return fname
+
+
+def pip_phases(log_file, start):
+    """
+    Divide the time of a run over its phases, using the timestamps in pip's log.
+    Builds running concurrently in several pip processes log to the same file, so their
+    time is divided over the phases approximately.
+    :param log_file: The log file pip wrote because of PIP_LOG.
+    :param start: The time.time() at which the run started.
+    :return: A dict mapping every phase to its wall time in seconds. The time before pip logged
+        anything (starting up and pip_install_privates' own work) is reported as 'prepare'.
+    """
+    phases = {}
+    current, previous = "prepare", start
+    with open(log_file) as log:
+        for line in log:
+            try:
+                timestamp = datetime.strptime(line[:23], "%Y-%m-%dT%H:%M:%S,%f").timestamp()
+            except ValueError:
+                continue
+            phases[current] = phases.get(current, 0) + timestamp - previous
+            previous = timestamp
+            message = line[24:].strip()
+            for name, markers in PHASE_MARKERS:
+                if message.startswith(markers):
+                    current = name
+                    break
+    return {name: round(seconds, 3) for name, seconds in phases.items()}
+
+
+def run_install(workspace, name, req_file, install_args):
+    """
+    Run pip_install_privates in a fresh virtualenv, with the caches of the workspace.
+    :param workspace: The directory with the fixtures and caches.
+    :param name: The name of the run, used for its virtualenv and log files.
+    :param req_file: The path to the requirements file.
+    :param install_args: Extra arguments for pip_install_privates.
+    :return: A dict with the wall time in seconds of every phase of the run.
+    """
+    timings = {}
+    environment = os.path.join(workspace, f"venv-{name}")
+    with phase(timings, "virtualenv"):
+        venv.create(environment, with_pip=True)
+
+    # Only use the fixtures, whatever pip configuration the machine has
+    env = {key: value for key, value in os.environ.items() if not key.startswith("PIP_")}
+    env.pop("GITHUB_TOKEN", None)
+    env.pop("CI_JOB_TOKEN", None)
+    env.update(
+        GIT_CONFIG_GLOBAL=os.path.join(workspace, "gitconfig"),
+        GIT_CONFIG_NOSYSTEM="1",
+        PIP_CONFIG_FILE=os.devnull,
+        PIP_INDEX_URL=f"file://{os.path.join(workspace, 'index')}",
+        PIP_CACHE_DIR=os.path.join(workspace, "pip-cache"),
+        PIP_DISABLE_PIP_VERSION_CHECK="1",
+        PIP_NO_INPUT="1",
+        PIP_LOG=os.path.join(workspace, f"{name}-pip.log"),
+        PYTHONPATH=PROJECT_ROOT,
+    )
+    command = [
+        os.path.join(environment, "bin", "python"),
+        "-m",
+        "pip_install_privates.install",
+    ] + install_args + [req_file]
+
+    start = time.time()
+    with phase(timings, "pip_install_privates"):
+        with open(os.path.join(workspace, f"{name}.log"), "w") as log:
+            returncode = subprocess.call(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if returncode != 0:
+        raise RuntimeError(f"Installing failed, see {log.name}")
+    for phase_name, seconds in pip_phases(env["PIP_LOG"], start).items():
+        timings[f"  {phase_name}"] = seconds
+        print(f"{'  ' + phase_name:24} {seconds:8.2f} s")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--private", type=int, default=6, help="Number of private packages.")
+    parser.add_argument("--public", type=int, default=10, help="Number of public packages.")
+    parser.add_argument(
+        "--install-args",
+        default="",
+        help=(
+            "Extra arguments for pip_install_privates, i.e. '--prefetch --build-wheels'. "
+            "{workspace} is replaced by the path of the workspace, i.e. '--cache-dir {workspace}/cache'."
+        ),
+    )
+    parser.add_argument("--json", help="Write the timings to this JSON file.")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspace with its logs.")
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix="pip-install-privates-benchmark-")
+    install_args = shlex.split(args.install_args.format(workspace=workspace))
+
+    timings = {}
+    try:
+        with phase(timings, "fixtures"):
+            req_file = create_fixtures(workspace, args.private, args.public)
+        for run in ("cold", "warm"):
+            print(f"{run}:")
+            timings[run] = run_install(workspace, run, req_file, install_args)
+    finally:
+        if args.keep:
+            print(f"Workspace: {workspace}")
+        else:
+            shutil.rmtree(workspace)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(timings, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
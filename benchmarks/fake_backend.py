@@ -0,0 +1,56 @@
+"""
+A minimal PEP 517 build backend for the fake packages of benchmarks.end_to_end.
+
+It is copied into every fake private repository, so pip can build the packages without downloading setuptools or
+wheel. The name, version and dependencies of the package are read from package.json in the source directory.
+"""
+import base64
+import hashlib
+import json
+import os
+import zipfile
+
+
+def write_wheel(directory, name, version, dependencies=()):
+    """
+    Write a pure Python wheel containing an empty package.
+    :param directory: The directory to write the wheel in.
+    :param name: The name of the distribution.
+    :param version: The version of the distribution.
+    :param dependencies: Requirement strings of the dependencies of the distribution.
+    :return: The file name of the wheel.
+    """
+    module = name.replace("-", "_")
+    dist_info = f"{module}-{version}.dist-info"
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    metadata += "".join(f"Requires-Dist: {dependency}\n" for dependency in dependencies)
+    files = {
+        f"{module}/__init__.py": f"__version__ = {version!r}\n",
+        f"{dist_info}/METADATA": metadata,
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nGenerator: fake_backend\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+
+    record = ""
+    for path, content in files.items():
+        digest = hashlib.sha256(content.encode("utf-8")).digest()
+        encoded = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+        record += f"{path},sha256={encoded},{len(content.encode('utf-8'))}\n"
+    files[f"{dist_info}/RECORD"] = record + f"{dist_info}/RECORD,,\n"
+
+    filename = f"{module}-{version}-py3-none-any.whl"
+    with zipfile.ZipFile(os.path.join(directory, filename), "w") as wheel:
+        for path, content in files.items():
+            wheel.writestr(path, content)
+    return filename
+
+
+def get_requires_for_build_wheel(config_settings=None):
+    return []
+
+
+def build_wheel(wheel_directory, config_settings=None, metadata_directory=None):
+    with open("package.json") as f:
+        package = json.load(f)
+    return write_wheel(
+        wheel_directory, package["name"], package["version"], package["dependencies"]
+    )
@@ -0,0 +1,59 @@
+"""
+Measure how long importing pip_install_privates takes, using python -X importtime.
+
+Usage: python -m benchmarks.import_time [--module MODULE] [--repeat N] [--max-ms MS]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter and collect the import times python reports.
+    :param module: The module to import.
+    :return: A dict mapping every imported module to its cumulative import time in microseconds.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    ).stderr
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="pip_install_privates.install")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        help="Exit with an error if the median import time exceeds this many milliseconds.",
+    )
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    median_ms = statistics.median(run[args.module] for run in runs) / 1000
+    imports_pip = any(name.startswith("pip._internal") for name in runs[0])
+
+    print(f"{args.module}: {median_ms:.1f} ms (median of {args.repeat} runs)")
+    print(f"imports pip._internal: {imports_pip}")
+    slowest = sorted(runs[0].items(), key=lambda item: item[1], reverse=True)[1:11]
+    for name, cumulative in slowest:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        sys.exit(f"Import time of {median_ms:.1f} ms exceeds {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark collect_requirements and the URL converters on synthetic requirements trees.
+
+Usage: python -m benchmarks.requirements [--repeat N] [--save-baseline FILE] [--baseline FILE] [--tolerance FRACTION]
+
+Everything runs offline: the requirements files are generated in a temporary directory and nothing is installed.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pip_install_privates.install import (
+    collect_requirements,
+    convert_potential_git_url,
+    transform_github_to_gitlab,
+)
+
+GITLAB_DOMAIN = "gitlab.example.com"
+GITHUB_ROOT_DIR = "MyOrg"
+
+# The kinds of lines found in real requirements files, %(i)s is replaced by a unique number
+LINE_TEMPLATES = (
+    "package-%(i)s==1.0.%(i)s",
+    "package-%(i)s>=1.0  # pinned for a reason",
+    "git+git@github.com:MyOrg/project-%(i)s.git@v1.%(i)s#egg=project_%(i)s",
+    "git+ssh://git@github.com/OtherOrg/project-%(i)s.git@v1.%(i)s#egg=project_%(i)s",
+    "git+git@gitlab.com:MyOrg/project-%(i)s.git@v1.%(i)s#egg=project_%(i)s",
+    "git+ssh://git@${GITLAB_DOMAIN}/MyOrg/project-%(i)s.git#egg=project_%(i)s",
+    "-e git+git@github.com:MyOrg/project-%(i)s.git@v1.%(i)s#egg=project_%(i)s",
+    "-e 'git+git@github.com:MyOrg/project-%(i)s.git#egg=project_%(i)s ; python_version==\"3.11\"'",
+    'git+https://github.com/MyOrg/project-%(i)s.git#egg=project_%(i)s ; python_version>="3.8"',
+    "package-%(i)s==1.0 --hash=sha256:%(hash)s",
+)
+
+
+def requirement_lines(count, offset=0):
+    """
+    Generate a mix of the lines found in requirements files.
+    :param count: The number of lines to generate.
+    :param offset: The number of the first line, so several files never contain the same lines.
+    :return: A list of lines.
+    """
+    return [
+        LINE_TEMPLATES[i % len(LINE_TEMPLATES)] % {"i": i, "hash": f"{i:064x}"}
+        for i in range(offset, offset + count)
+    ]
+
+
+def project_names(count):
+    """
+    Generate a PROJECT_NAMES value that matches every other GitHub project in the generated lines.
+    :param count: The number of project names.
+    :return: A comma-separated string of project names.
+    """
+    return ",".join(f"project-{i * 2}" for i in range(count))
+
+
+def write_tree(directory, lines, depth):
+    """
+    Write a chain of requirements files, each including the next one with -r.
+    :param directory: The directory to write the files in.
+    :param lines: The total number of requirement lines, spread over all files.
+    :param depth: The number of files in the chain.
+    :return: The path to the first file.
+    """
+    per_file = max(lines // depth, 1)
+    for level in reversed(range(depth)):
+        contents = requirement_lines(per_file, offset=level * per_file)
+        if level + 1 < depth:
+            contents.insert(0, f"-r level-{level + 1}.txt")
+        with open(os.path.join(directory, f"level-{level}.txt"), "w") as f:
+            f.write("\n".join(contents) + "\n")
+    return os.path.join(directory, "level-0.txt")
+
+
+def measure(function, repeat):
+    """
+    Time a function and record the peak memory it allocates.
+    :param function: The function to call without arguments.
+    :param repeat: The number of timed calls.
+    :return: A dict with the median and minimum time in milliseconds, and the peak memory in KiB.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Memory is traced in a separate call, since tracemalloc slows down the code it traces
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def scenarios(directory):
+    """
+    Build the benchmark scenarios.
+    :param directory: A directory to write the generated requirements files in.
+    :return: A dict mapping the name of every scenario to a function without arguments.
+    """
+    options = dict(
+        transform_with_token="my-token",
+        gitlab_domain=GITLAB_DOMAIN,
+        ci_job_token="my-ci-token",
+        github_root_dir=GITHUB_ROOT_DIR,
+    )
+
+    trees = {}
+    for name, lines, depth in (
+        ("many_lines", 10000, 1),
+        ("deep_nesting", 2000, 200),
+    ):
+        os.mkdir(os.path.join(directory, name))
+        trees[name] = write_tree(os.path.join(directory, name), lines, depth)
+
+    urls = [line for line in requirement_lines(1000) if line.startswith("git+")]
+    names_10k = project_names(10000)
+    names_10k_list = names_10k.split(",")
+
+    return {
+        "collect_requirements/many_lines": lambda: collect_requirements(
+            trees["many_lines"], project_names=project_names(100), **options
+        ),
+        "collect_requirements/deep_nesting": lambda: collect_requirements(
+            trees["deep_nesting"], project_names=project_names(100), **options
+        ),
+        "collect_requirements/large_project_names": lambda: collect_requirements(
+            trees["many_lines"], project_names=names_10k, **options
+        ),
+        "convert_potential_git_url": lambda: [
+            convert_potential_git_url(
+                url.split()[0], url.split(), "my-token", GITLAB_DOMAIN, "my-ci-token"
+            )
+            for url in urls
+        ],
+        "transform_github_to_gitlab": lambda: [
+            transform_github_to_gitlab(
+                url.split()[0], "my-ci-token", GITLAB_DOMAIN, GITHUB_ROOT_DIR, names_10k_list
+            )
+            for url in urls
+        ],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find the scenarios that became slower or use more memory than in the baseline.
+    :param results: The results of this run.
+    :param baseline: The results of an earlier run.
+    :param tolerance: The fraction a measurement may exceed the baseline by, i.e. 0.25 for 25%.
+    :return: A list of descriptions of the regressions.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        # The fastest run is compared, since it is least affected by other load on the machine
+        for metric in ("min_ms", "peak_kib"):
+            if result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} exceeds baseline {expected[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare the results to this JSON file.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Fraction a result may exceed the baseline by before it is reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    # Debug logging of every line would dominate the timings
+    logging.disable(logging.DEBUG)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, function in scenarios(directory).items():
+            results[name] = measure(function, args.repeat)
+            print(
+                f"{name:45} {results[name]['median_ms']:10.1f} ms "
+                f"{results[name]['peak_kib']:10.1f} KiB"
+            )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            sys.exit(f"{len(regressions)} regressions compared to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
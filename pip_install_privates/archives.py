@@ -0,0 +1,78 @@
+import logging
+from urllib.parse import quote, urlsplit
+
+from pip_install_privates.credentials import netrc_credentials
+from pip_install_privates.rewrite import GITHUB_DOMAIN, GITLAB_DEFAULT_DOMAIN
+from pip_install_privates.vcs import add_markers, iter_vcs_requirements, strip_credentials
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_DOMAIN = "api.github.com"
+
+
+def archive_url(vcs_requirement, gitlab_domain=None):
+    """
+    Determine the URL of the source archive of a git requirement on GitHub or GitLab.
+    :param vcs_requirement: The VcsRequirement to get the archive for.
+    :param gitlab_domain: The domain of the GitLab instance, in addition to gitlab.com.
+    :return: The archive URL, with the fragment of the requirement (i.e. #egg=my_project), or None if the
+        requirement does not refer to a ref or is not hosted on GitHub or GitLab.
+    """
+    if not vcs_requirement.ref:
+        return None
+    scheme, netloc, path, _, _ = urlsplit(strip_credentials(vcs_requirement.url))
+    if scheme not in ("http", "https"):
+        return None
+    repository = path.strip("/")
+    if repository.endswith(".git"):
+        repository = repository[: -len(".git")]
+    ref = quote(vcs_requirement.ref, safe="/")
+
+    if netloc == GITHUB_DOMAIN:
+        url = f"{scheme}://{GITHUB_API_DOMAIN}/repos/{repository}/tarball/{ref}"
+    elif netloc in (GITLAB_DEFAULT_DOMAIN, (gitlab_domain or "").split("/")[0]):
+        name = repository.rsplit("/", 1)[-1]
+        url = f"{scheme}://{netloc}/{repository}/-/archive/{ref}/{name}-{ref.replace('/', '-')}.tar.gz"
+    else:
+        return None
+    if vcs_requirement.fragment:
+        url = f"{url}#{vcs_requirement.fragment}"
+    return url
+
+
+def use_archives(requirements, gitlab_domain=None):
+    """
+    Let pip download source archives of git requirements instead of cloning the repositories.
+    Downloading an archive is much faster than a clone, and goes through pip's HTTP cache.
+    :param requirements: The requirements as returned by collect_requirements, without tokens in the URLs.
+    :param gitlab_domain: The domain of the GitLab instance, in addition to gitlab.com.
+    :return: The requirements, with git requirements of a ref rewritten to archive URLs.
+    """
+    requirements = list(requirements)
+    for index, vcs_requirement in iter_vcs_requirements(requirements):
+        url = archive_url(vcs_requirement, gitlab_domain)
+        if url:
+            logger.debug(f"Using archive {url}")
+            if vcs_requirement.name:
+                url = f"{vcs_requirement.name} @ {url}"
+            requirements[index] = add_markers(url, vcs_requirement.markers)
+    return requirements
+
+
+def archive_credentials(github_token=None, gitlab_domain=None, gitlab_token=None):
+    """
+    Let pip authenticate archive downloads with the tokens, in an Authorization header.
+    :param github_token: The GitHub access token.
+    :param gitlab_domain: The domain of the GitLab instance, instead of gitlab.com.
+    :param gitlab_token: The GitLab (CI job) token.
+    :return: A context manager that provides a temporary netrc file.
+    """
+    machines = {}
+    if github_token:
+        machines[GITHUB_API_DOMAIN] = (github_token, "x-oauth-basic")
+    if gitlab_token:
+        # The token only belongs to the configured GitLab instance, and netrc entries are matched
+        # on the host name only, without a port
+        host = urlsplit(f"//{gitlab_domain or GITLAB_DEFAULT_DOMAIN}").hostname
+        machines[host] = ("gitlab-ci-token", gitlab_token)
+    return netrc_credentials(machines)
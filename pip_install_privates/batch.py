@@ -0,0 +1,159 @@
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pip_install_privates.includes import IncludeTracker, file_key
+from pip_install_privates.split import write_requirements_file
+
+logger = logging.getLogger(__name__)
+
+# The ParseCache of a worker process of transform_files
+_worker_cache = None
+
+
+class ParseCache(object):
+    """
+    The transformed lines of every requirements file read so far, shared by all trees collected with it.
+    Files that many requirements files include, like a common base.txt, are only read and transformed once.
+    It is created with the keyword arguments that would be passed to collect_requirements, apart from jobs.
+    """
+
+    def __init__(self, **options):
+        # install imports this module in the batch command, so import from it lazily too
+        from pip_install_privates.install import _get_requirements_rewriter
+
+        self.rewriter = _get_requirements_rewriter(
+            options.get("transform_with_token"),
+            options.get("gitlab_domain"),
+            options.get("ci_job_token"),
+            options.get("github_root_dir"),
+            options.get("project_names"),
+        )
+        self.files = {}
+
+    def transformed_lines(self, fname):
+        """
+        Get the transformed lines of a single requirements file, without following its includes.
+        :param fname: The path to the requirements file.
+        :return: A list of (included file, None) and (None, pip arguments) tuples.
+        """
+        from pip_install_privates.install import _transform_lines
+
+        key = file_key(fname)
+        if key not in self.files:
+            with open(fname) as reqs:
+                self.files[key] = list(_transform_lines(fname, reqs, self.rewriter))
+        else:
+            logger.debug(f"Using transformed lines of {fname} read before")
+        return self.files[key]
+
+    def collect(self, fname):
+        """
+        Collect the requirements of a file and the files it (indirectly) includes, like collect_requirements.
+        :param fname: The path to the requirements file.
+        :return: A list of collected and transformed requirements.
+        """
+        return list(self._iter_requirements(fname, IncludeTracker()))
+
+    def _iter_requirements(self, fname, tracker):
+        if not tracker.enter(fname):
+            return
+        try:
+            for include, tokens in self.transformed_lines(fname):
+                if include:
+                    yield from self._iter_requirements(include, tracker)
+                elif tracker.new_requirement(tokens):
+                    yield from tokens
+        finally:
+            tracker.leave()
+
+
+def expand_patterns(patterns):
+    """
+    Find the requirements files matching paths and glob patterns, like services/*/requirements.txt.
+    Recursive patterns with ** are supported.
+    :param patterns: The paths and glob patterns.
+    :return: A sorted list of the paths of the matching files, without duplicates.
+    """
+    fnames = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and not glob.has_magic(pattern):
+            # Report a missing file when transforming it, like for a single requirements file
+            matches = [pattern]
+        if not matches:
+            logger.warning(f"No requirements files match {pattern}")
+        fnames.update(path for path in matches if not os.path.isdir(path))
+    return sorted(fnames)
+
+
+def output_paths(fnames, output_dir):
+    """
+    Determine where the transformed requirements of each file are written, keeping the directory structure
+    of the files below their common directory so files with the same name do not overwrite each other.
+    :param fnames: The paths to the requirements files.
+    :param output_dir: The directory to write the transformed requirements files to.
+    :return: A list of paths in the output directory, in the order of fnames.
+    """
+    keys = [file_key(fname) for fname in fnames]
+    root = os.path.commonpath([os.path.dirname(key) for key in keys])
+    return [os.path.join(output_dir, os.path.relpath(key, root)) for key in keys]
+
+
+def _init_worker(options):
+    global _worker_cache
+    _worker_cache = ParseCache(**options)
+
+
+def _transform_in_worker(paths):
+    return _transform_file(_worker_cache, *paths)
+
+
+def _transform_file(cache, fname, output):
+    try:
+        requirements = cache.collect(fname)
+    except (OSError, RuntimeError) as e:
+        logger.error(f"Could not transform {fname}: {e}")
+        return False
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    write_requirements_file(requirements, output)
+    logger.debug(f"Wrote the {len(requirements)} requirements of {fname} to {output}")
+    return True
+
+
+def transform_files(fnames, output_dir, jobs=None, **options):
+    """
+    Collect and transform the requirements of many requirements files at once, and write them to an
+    output directory. Every worker process keeps a ParseCache, and gets neighbouring files in chunks,
+    so the files they include in common are transformed once per worker instead of once per file.
+    :param fnames: The paths to the requirements files.
+    :param output_dir: The directory to write the transformed requirements files to.
+    :param jobs: The number of worker processes, defaults to the number of CPUs.
+        With 1, all files are transformed in this process.
+    :param options: The keyword arguments to pass to collect_requirements.
+    :return: A list of the paths of the written files, in the order of fnames.
+    """
+    if not fnames:
+        return []
+    jobs = jobs or os.cpu_count() or 1
+    outputs = output_paths(fnames, output_dir)
+    pairs = list(zip(fnames, outputs))
+    if jobs == 1 or len(fnames) == 1:
+        cache = ParseCache(**options)
+        results = [_transform_file(cache, fname, output) for fname, output in pairs]
+    else:
+        # Several chunks per worker, so a worker that got slow files does not hold up the rest
+        chunksize = max(1, len(pairs) // (jobs * 4))
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(options,)
+        ) as executor:
+            results = list(executor.map(_transform_in_worker, pairs, chunksize=chunksize))
+    failed = [fname for fname, result in zip(fnames, results) if not result]
+    if failed:
+        raise RuntimeError(
+            f"Could not transform {len(failed)} of {len(fnames)} requirements files: "
+            f"{', '.join(failed)}"
+        )
+    logger.info(f"Transformed {len(fnames)} requirements files into {output_dir}")
+    return outputs
@@ -0,0 +1,103 @@
+import logging
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+from pip_install_privates.rewrite import GITLAB_DEFAULT_DOMAIN
+
+logger = logging.getLogger(__name__)
+
+GITHUB_TOKEN_VARIABLE = "PIP_INSTALL_PRIVATES_GITHUB_TOKEN"
+GITLAB_TOKEN_VARIABLE = "PIP_INSTALL_PRIVATES_GITLAB_TOKEN"
+GITLAB_DOMAIN_VARIABLE = "PIP_INSTALL_PRIVATES_GITLAB_DOMAIN"
+
+# git calls the askpass program with the prompt as its only argument, i.e.:
+#   Username for 'https://github.com':
+#   Password for 'https://gitlab-ci-token@gitlab.com':
+# The tokens are read from the environment, so they are never written to disk. Prompts of any other
+# host get an empty answer, so the GitLab token is only handed to the configured GitLab instance.
+ASKPASS_SCRIPT = """#!/bin/sh
+case "$1" in
+    Username*github.com*) echo "${GITHUB_TOKEN_VARIABLE}" ;;
+    Password*github.com*) echo "x-oauth-basic" ;;
+    Username*[/@]"${GITLAB_DOMAIN_VARIABLE}"\\'*) echo "gitlab-ci-token" ;;
+    Password*[/@]"${GITLAB_DOMAIN_VARIABLE}"\\'*) echo "${GITLAB_TOKEN_VARIABLE}" ;;
+esac
+""".replace(
+    "GITHUB_TOKEN_VARIABLE", GITHUB_TOKEN_VARIABLE
+).replace(
+    "GITLAB_TOKEN_VARIABLE", GITLAB_TOKEN_VARIABLE
+).replace(
+    "GITLAB_DOMAIN_VARIABLE", GITLAB_DOMAIN_VARIABLE
+)
+
+
+@contextmanager
+def patched_environment(variables):
+    """
+    Temporarily set environment variables, restoring the previous values afterwards.
+    :param variables: Mapping of variable names to values.
+    """
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def git_askpass(github_token=None, gitlab_token=None, gitlab_domain=None):
+    """
+    Let git ask a generated GIT_ASKPASS helper for credentials instead of embedding tokens in URLs.
+    Because the requirement URLs stay free of tokens, pip's wheel cache keeps working when tokens rotate.
+    :param github_token: The GitHub access token to hand to git.
+    :param gitlab_token: The GitLab (CI job) token to hand to git.
+    :param gitlab_domain: The domain of the GitLab instance the token belongs to, gitlab.com if not given.
+    """
+    fd, script = tempfile.mkstemp(prefix="pip-install-privates-askpass-", suffix=".sh")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            handle.write(ASKPASS_SCRIPT)
+        os.chmod(script, stat.S_IRUSR | stat.S_IXUSR)
+        variables = {
+            "GIT_ASKPASS": script,
+            "GIT_TERMINAL_PROMPT": "0",
+            GITHUB_TOKEN_VARIABLE: github_token or "",
+            GITLAB_TOKEN_VARIABLE: gitlab_token or "",
+            # git prompts with the host and port only, without the path of the instance
+            GITLAB_DOMAIN_VARIABLE: (gitlab_domain or GITLAB_DEFAULT_DOMAIN).split("/")[0],
+        }
+        logger.debug(f"Using git askpass helper {script}")
+        with patched_environment(variables):
+            yield script
+    finally:
+        os.unlink(script)
+
+
+@contextmanager
+def netrc_credentials(machines):
+    """
+    Hand credentials to pip through a temporary netrc file, so they are sent in an Authorization header
+    instead of being embedded in URLs. Entries of the netrc file already in use are kept.
+    :param machines: Mapping of host names to (login, password) tuples.
+    """
+    existing = os.environ.get("NETRC") or os.path.expanduser("~/.netrc")
+    fd, netrc_file = tempfile.mkstemp(prefix="pip-install-privates-", suffix=".netrc")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            for host, (login, password) in machines.items():
+                handle.write(f"machine {host} login {login} password {password}\n")
+            if os.path.isfile(existing):
+                with open(existing) as f:
+                    handle.write(f.read())
+        logger.debug(f"Using netrc file {netrc_file}")
+        with patched_environment({"NETRC": netrc_file}):
+            yield netrc_file
+    finally:
+        os.unlink(netrc_file)
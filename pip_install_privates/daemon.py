@@ -0,0 +1,283 @@
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager, redirect_stderr, redirect_stdout
+
+from pip_install_privates.credentials import git_askpass
+from pip_install_privates.refs import DEFAULT_REF_TTL, RefCache, pin_refs
+from pip_install_privates.requirements_cache import hash_include_tree
+
+logger = logging.getLogger(__name__)
+
+
+class RequirementsDaemon(object):
+    """
+    The state a daemon keeps warm between requests: pip and the rewrite rules stay imported and compiled,
+    transformed requirements are kept in memory while none of the files in their -r tree changes, and
+    resolved refs are kept in a RefCache.
+    """
+
+    def __init__(self, ref_cache):
+        self.ref_cache = ref_cache
+        self.collected = {}
+        # Refs are resolved, and pip runs, with credentials and the environment of the client in the
+        # environment of the process, so only one request at a time may collect or install
+        self.environment_lock = threading.Lock()
+
+    def collect(self, req_files, options, pin=False, askpass=None, jobs=None):
+        """
+        Collect and transform the requirements of files, reusing the result of an earlier request.
+        :param req_files: The absolute paths to the requirements files, which are collected in one pass.
+        :param options: The keyword arguments to pass to collect_requirements.
+        :param pin: Whether to pin the refs of git requirements to commits.
+        :param askpass: The keyword arguments for git_askpass if the tokens are not in the URLs, or None.
+        :param jobs: The maximum number of concurrent file reads and ref lookups.
+        :return: A list of collected and transformed requirements.
+        """
+        # install imports this module in the functions that use the daemon, so import from it lazily too
+        from pip_install_privates.install import collect_requirements
+
+        # collect_requirements reads PROJECT_NAMES from the environment and paths are relative to the working
+        # directory, both of which belong to the client that is installing while install holds the lock
+        with self.environment_lock, ExitStack() as stack:
+            # Only the last result per set of files is kept, so rotating tokens do not make the daemon grow
+            key = tuple(req_files)
+            files = hash_include_tree(*req_files)
+            cached_options, cached_files, cached_requirements = self.collected.get(
+                key, (None, None, None)
+            )
+            if files is not None and (cached_options, cached_files) == (options, files):
+                logger.debug(f"Using requirements of {', '.join(req_files)} collected before")
+                requirements = list(cached_requirements)
+            else:
+                requirements = collect_requirements(*req_files, jobs=jobs, **options)
+                if files is not None:
+                    self.collected[key] = (options, files, list(requirements))
+            if pin:
+                if askpass:
+                    stack.enter_context(git_askpass(**askpass))
+                requirements = pin_refs(requirements, self.ref_cache, jobs)
+        return requirements
+
+    def install(self, requirements, askpass=None, prefix=None, cwd=None, env=None):
+        """
+        Install requirements with pip into the environment of the daemon, on behalf of a client.
+        :param requirements: The arguments for pip install.
+        :param askpass: The keyword arguments for git_askpass if the tokens are not in the URLs, or None.
+        :param prefix: The sys.prefix of the client, which has to be the environment of the daemon.
+        :param cwd: The working directory of the client, which relative paths in the requirements are relative to.
+        :param env: The environment variables of the client, like PIP_INDEX_URL.
+        :return: A tuple of the exit status of pip and its output.
+        """
+        from pip_install_privates.install import pip_main
+
+        if prefix and os.path.realpath(prefix) != os.path.realpath(sys.prefix):
+            raise RuntimeError(
+                f"The daemon runs in {sys.prefix} and can not install into {prefix}, "
+                f"start a daemon with the Python of {prefix} to install into it"
+            )
+        output = io.StringIO()
+        with self.environment_lock, ExitStack() as stack:
+            stack.enter_context(_client_environment(cwd, env))
+            if askpass:
+                stack.enter_context(git_askpass(**askpass))
+            with redirect_stdout(output), redirect_stderr(output):
+                returncode = pip_main(["install"] + requirements)
+        return returncode, output.getvalue()
+
+    def handle(self, message):
+        """
+        Handle a request of a client.
+        :param message: The request, a dict with the command and its arguments.
+        :return: The response, a dict.
+        """
+        command = message.get("command")
+        if command == "collect":
+            requirements = self.collect(
+                message["req_files"],
+                message["options"],
+                pin=message.get("pin_refs", False),
+                askpass=message.get("askpass"),
+                jobs=message.get("jobs"),
+            )
+            return {"requirements": requirements}
+        if command == "install":
+            returncode, output = self.install(
+                message["requirements"],
+                message.get("askpass"),
+                prefix=message.get("prefix"),
+                cwd=message.get("cwd"),
+                env=message.get("env"),
+            )
+            return {"returncode": returncode, "output": output}
+        if command == "ping":
+            return {"pid": os.getpid()}
+        raise RuntimeError(f"Unknown command {command}")
+
+
+@contextmanager
+def _client_environment(cwd=None, env=None):
+    # The working directory and environment belong to the whole process, so only hold them under the
+    # environment lock of the daemon
+    previous_cwd = os.getcwd()
+    previous_env = dict(os.environ)
+    try:
+        if cwd:
+            os.chdir(cwd)
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(env)
+        yield
+    finally:
+        os.chdir(previous_cwd)
+        os.environ.clear()
+        os.environ.update(previous_env)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.daemon.handle(json.loads(line))
+            except Exception as e:
+                logger.exception("Error handling request")
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def _check_unix_sockets():
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("The daemon needs Unix sockets, which are not available on this platform")
+
+
+# Unix sockets are not available on Windows, so the package can still be imported there
+class DaemonServer(getattr(socketserver, "ThreadingUnixStreamServer", object)):
+    daemon_threads = True
+
+    def __init__(self, socket_path, daemon):
+        self.daemon = daemon
+        # Requests carry tokens, so only the user running the daemon may connect
+        previous_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+
+def _remove_stale_socket(socket_path):
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise RuntimeError(f"{socket_path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # Left behind by a daemon that did not shut down cleanly
+            logger.debug(f"Removing stale socket {socket_path}")
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"A daemon is already listening on {socket_path}")
+
+
+def serve(socket_path, cache_dir=None, ref_ttl=DEFAULT_REF_TTL):
+    """
+    Run a daemon that collects requirements and installs them on behalf of clients, until it is interrupted.
+    :param socket_path: The path of the Unix socket to listen on.
+    :param cache_dir: The directory to keep resolved refs in, or None to only keep them in memory.
+    :param ref_ttl: The number of seconds resolved refs are cached.
+    """
+    _check_unix_sockets()
+    with ExitStack() as stack:
+        if not cache_dir:
+            cache_dir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="pip-install-privates-")
+            )
+        daemon = RequirementsDaemon(RefCache(os.path.join(cache_dir, "refs.json"), ref_ttl))
+        _remove_stale_socket(socket_path)
+        server = stack.enter_context(DaemonServer(socket_path, daemon))
+        stack.callback(os.unlink, socket_path)
+        logger.info(f"Listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def request(socket_path, message):
+    """
+    Send a request to a daemon and wait for the response.
+    :param socket_path: The path of the Unix socket the daemon listens on.
+    :param message: The request, a dict with the command and its arguments.
+    :return: The response, a dict.
+    """
+    _check_unix_sockets()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(message).encode("utf-8") + b"\n")
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise RuntimeError(f"The daemon at {socket_path} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(f"Error in the daemon at {socket_path}: {response['error']}")
+    return response
+
+
+def collect_with_daemon(socket_path, req_file, options, pin=False, askpass=None, jobs=None):
+    """
+    Let a daemon collect and transform the requirements of one or more files.
+    :param socket_path: The path of the Unix socket the daemon listens on.
+    :param req_file: The path to the requirements file, or a list of paths of files to collect in one pass.
+    :param options: The keyword arguments to pass to collect_requirements.
+    :param pin: Whether to let the daemon pin the refs of git requirements to commits.
+    :param askpass: The keyword arguments for git_askpass if the tokens are not in the URLs, or None.
+    :param jobs: The maximum number of concurrent ref lookups.
+    :return: A list of collected and transformed requirements.
+    """
+    if isinstance(req_file, str):
+        req_file = [req_file]
+    message = {
+        "command": "collect",
+        "req_files": [os.path.abspath(name) for name in req_file],
+        "options": options,
+        "pin_refs": pin,
+        "askpass": askpass,
+        "jobs": jobs,
+    }
+    return request(socket_path, message)["requirements"]
+
+
+def install_with_daemon(socket_path, requirements, askpass=None):
+    """
+    Let a daemon install requirements with pip, in the working directory and environment variables of this
+    process. The daemon has to run in the same environment as this process, since that is where pip installs into.
+    :param socket_path: The path of the Unix socket the daemon listens on.
+    :param requirements: The arguments for pip install.
+    :param askpass: The keyword arguments for git_askpass if the tokens are not in the URLs, or None.
+    :return: The exit status of pip.
+    """
+    message = {
+        "command": "install",
+        "requirements": requirements,
+        "askpass": askpass,
+        "prefix": sys.prefix,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+    }
+    response = request(socket_path, message)
+    sys.stdout.write(response.get("output", ""))
+    sys.stdout.flush()
+    return response["returncode"]
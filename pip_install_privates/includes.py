@@ -0,0 +1,131 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class IncludeCycleError(RuntimeError):
+    """
+    Raised when requirements files include each other through -r.
+    """
+
+    def __init__(self, chain):
+        super().__init__(
+            f"Requirements files include each other: {' -> '.join(chain)}"
+        )
+        self.chain = chain
+
+
+def file_key(fname):
+    """
+    Identify a requirements file, no matter if it was referred to by a relative or an absolute path.
+    :param fname: The path to the requirements file.
+    :return: The normalized absolute path.
+    """
+    return os.path.normpath(os.path.join(os.getcwd(), fname))
+
+
+def included_file(fname, include):
+    """
+    Determine the path of a file included with -r, which is relative to the including file.
+    :param fname: The path to the including requirements file.
+    :param include: The path as written after -r.
+    :return: The path to the included file.
+    """
+    curdir = os.path.abspath(os.path.dirname(fname))
+    return os.path.join(curdir, include)
+
+
+def iter_includes(fname, lines):
+    """
+    Find the files included with -r in the lines of a requirements file.
+    :param fname: The path to the requirements file.
+    :param lines: The lines of the requirements file.
+    :return: An iterator of paths to the included files.
+    """
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) > 1 and tokens[0] == "-r":
+            yield included_file(fname, tokens[1])
+
+
+class IncludeTracker(object):
+    """
+    Keeps track of the requirements files of a tree while it is walked.
+    Every distinct file is walked only once, even if several files include it, and
+    a file that (indirectly) includes itself is reported as soon as it is reached.
+    With deduplicate, requirements listed several times are only collected once. That holds every
+    requirement line in memory, so it is only used when several top-level files are merged.
+    """
+
+    def __init__(self, deduplicate=False):
+        self.stack = []
+        self.seen = set()
+        self.requirements = set() if deduplicate else None
+
+    def enter(self, fname):
+        """
+        Start walking a requirements file.
+        :param fname: The path to the requirements file.
+        :return: True if the file should be walked, False if it was walked before.
+        """
+        key = file_key(fname)
+        if key in self.stack:
+            raise IncludeCycleError(self.stack[self.stack.index(key):] + [key])
+        if key in self.seen:
+            logger.debug(f"Skipping {fname}, it was included before")
+            return False
+        self.seen.add(key)
+        self.stack.append(key)
+        return True
+
+    def leave(self):
+        """
+        Finish walking the requirements file that was entered last.
+        """
+        self.stack.pop()
+
+    def new_requirement(self, tokens):
+        """
+        Check if a requirement line was not collected before.
+        :param tokens: The pip arguments of the requirement line.
+        :return: True if the requirement should be collected, False if it was collected before.
+        """
+        if self.requirements is None:
+            return True
+        key = tuple(tokens)
+        if key in self.requirements:
+            return False
+        self.requirements.add(key)
+        return True
+
+
+def _read_lines(fname):
+    with open(fname) as reqs:
+        return reqs.readlines()
+
+
+def read_include_tree(fname, jobs=None):
+    """
+    Read a requirements file and all files it (indirectly) includes, reading independent files concurrently.
+    This hides the latency of slow (network) filesystems, at the cost of holding the whole tree in memory.
+    :param fname: The path to the requirements file.
+    :param jobs: The maximum number of files to read concurrently, defaults to the number of CPUs.
+    :return: A dict mapping the file_key of every file in the tree to its lines.
+    """
+    contents = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        scheduled = {file_key(fname)}
+        pending = {executor.submit(_read_lines, fname): fname}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                contents[file_key(path)] = lines = future.result()
+                for include in iter_includes(path, lines):
+                    if file_key(include) not in scheduled:
+                        scheduled.add(file_key(include))
+                        pending[executor.submit(_read_lines, include)] = include
+    logger.debug(f"Read {len(contents)} requirements files")
+    return contents
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from pip_install_privates.satisfied import iter_requirement_indexes
+from pip_install_privates.split import PRIVATE, PUBLIC, is_public_requirement
+from pip_install_privates.vcs import parse_vcs_requirement
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS = "prometheus"
+JSON_LINES = "jsonl"
+METRIC_PREFIX = "pip_install_privates_"
+
+# The help text of every metric, which is also the order they are written in
+METRICS = (
+    ("success", "Whether the run succeeded (1) or failed (0)."),
+    ("timestamp_seconds", "Unix time at which the run ended."),
+    ("duration_seconds", "Wall time of the run."),
+    ("phase_seconds", "Wall time of a phase of the run."),
+    ("requirements", "Number of requirements processed."),
+    ("private_urls", "Number of git requirements per host."),
+    ("cache_hits", "Number of cache lookups that were hits."),
+    ("cache_misses", "Number of cache lookups that were misses."),
+    ("downloaded_bytes", "Bytes pip downloaded, not counting its HTTP cache and git clones."),
+    ("peak_rss_bytes", "Peak resident set size of pip_install_privates and pip."),
+    (
+        "children_peak_rss_bytes",
+        "Peak resident set size of the largest subprocess, like git or a build.",
+    ),
+    ("children_cpu_seconds", "User and system CPU time of subprocesses, like git and builds."),
+)
+
+
+def _max_rss_bytes(usage):
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class Metrics(object):
+    """
+    Collect metrics of an installation, to be exported to a Prometheus textfile or a JSON lines file.
+    Caches are registered as they are used, and are asked for their hits and misses when the run ends.
+    """
+
+    def __init__(self):
+        self.requirements = []
+        self.caches = {}
+
+    def add_cache(self, name, cache):
+        """
+        Report the hits and misses of a cache with hits and misses attributes.
+        :param name: The name of the cache, used as the value of the cache label.
+        :param cache: The cache.
+        """
+        self.caches[name] = cache
+
+    def samples(self, profiler, success):
+        """
+        Gather the metrics of the run.
+        :param profiler: The Profiler that timed the run.
+        :param success: Whether the run succeeded.
+        :return: A list of (name, labels, value) tuples, with names as in METRICS.
+        """
+        samples = [
+            ("success", {}, int(success)),
+            ("timestamp_seconds", {}, round(time.time(), 3)),
+            ("duration_seconds", {}, profiler.report()["wall_s"]),
+        ]
+        for phase, timings in sorted(profiler.phases.items()):
+            samples.append(("phase_seconds", {"phase": phase}, timings["wall_s"]))
+
+        kinds = Counter(
+            PUBLIC if is_public_requirement(self.requirements[index]) else PRIVATE
+            for index in iter_requirement_indexes(self.requirements)
+        )
+        for kind in (PUBLIC, PRIVATE):
+            samples.append(("requirements", {"kind": kind}, kinds[kind]))
+        vcs_requirements = [
+            parse_vcs_requirement(self.requirements[index])
+            for index in iter_requirement_indexes(self.requirements)
+        ]
+        hosts = Counter(urlsplit(v.url).hostname or "local" for v in vcs_requirements if v)
+        for host, count in sorted(hosts.items()):
+            samples.append(("private_urls", {"host": host}, count))
+
+        for name, cache in sorted(self.caches.items()):
+            samples.append(("cache_hits", {"cache": name}, cache.hits))
+            samples.append(("cache_misses", {"cache": name}, cache.misses))
+            if getattr(cache, "remote", None):
+                labels = {"cache": f"remote_{name}"}
+                samples.append(("cache_hits", labels, cache.remote_hits))
+                samples.append(("cache_misses", labels, cache.remote_misses))
+
+        samples.append(("downloaded_bytes", {}, profiler.downloaded_bytes))
+        try:
+            import resource
+        except ImportError:
+            # Resource usage is not available on Windows
+            return samples
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        samples += [
+            ("peak_rss_bytes", {}, _max_rss_bytes(resource.getrusage(resource.RUSAGE_SELF))),
+            ("children_peak_rss_bytes", {}, _max_rss_bytes(children)),
+            ("children_cpu_seconds", {}, children.ru_utime + children.ru_stime),
+        ]
+        return samples
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(samples):
+    """
+    Format metrics in the Prometheus text format, as read by the textfile collector of the node exporter.
+    :param samples: The metrics as returned by Metrics.samples.
+    :return: The metrics as text.
+    """
+    lines = []
+    for name, help_text in METRICS:
+        values = [(labels, value) for sample, labels, value in samples if sample == name]
+        if not values:
+            continue
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} gauge")
+        for labels, value in values:
+            label_text = ",".join(
+                f'{key}="{_escape_label(label)}"' for key, label in sorted(labels.items())
+            )
+            if label_text:
+                lines.append(f"{METRIC_PREFIX}{name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{METRIC_PREFIX}{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(samples, path, format=PROMETHEUS):
+    """
+    Export metrics. A Prometheus textfile is replaced atomically, so the collector never reads half a file,
+    while a JSON lines file gets a line appended for every run.
+    :param samples: The metrics as returned by Metrics.samples.
+    :param path: The path of the file.
+    :param format: PROMETHEUS or JSON_LINES.
+    """
+    if format == JSON_LINES:
+        metrics = [
+            {"name": name, "labels": labels, "value": value} for name, labels, value in samples
+        ]
+        line = json.dumps({"metrics": metrics}, sort_keys=True)
+        # A single write of a line in append mode keeps lines of concurrent runs apart
+        with open(path, "a") as f:
+            f.write(f"{line}\n")
+    else:
+        partial = f"{path}.partial.{os.getpid()}"
+        with open(partial, "w") as f:
+            f.write(format_prometheus(samples))
+        os.replace(partial, path)
+    logger.debug(f"Wrote metrics to {path}")
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from pip_install_privates.vcs import (
+    clone_mirror,
+    format_vcs_requirement,
+    iter_vcs_requirements,
+    markers_apply,
+    strip_credentials,
+    update_mirror,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def mirror_path(directory, url):
+    """
+    Determine where the local mirror of a repository lives.
+    :param directory: The directory holding the mirrors.
+    :param url: The repository URL.
+    :return: The path of the mirror.
+    """
+    repository = hashlib.sha256(strip_credentials(url).encode("utf-8")).hexdigest()
+    return os.path.join(os.path.abspath(directory), f"{repository[:16]}.git")
+
+
+@contextmanager
+def locked(path):
+    """
+    Hold an exclusive lock on a file, so concurrent runs do not update the same mirror at the same time.
+    :param path: The path of the lock file.
+    """
+    with open(path, "w") as lock:
+        if os.name == "nt":
+            import msvcrt
+
+            # LK_LOCK gives up after 10 seconds, while updating a mirror may take longer
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    logger.debug(f"Waiting for the lock on {path}")
+            try:
+                yield
+            finally:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+
+        # fcntl is not available on Windows
+        import fcntl
+
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _update_locked_mirror(url, destination):
+    with locked(f"{destination}.lock"):
+        update_mirror(url, destination)
+
+
+def _use_local_repositories(requirements, directory, update, jobs=None):
+    requirements = list(requirements)
+    # Requirements whose markers do not apply are skipped by pip, so they are not cloned either
+    vcs_requirements = [
+        (index, vcs_requirement)
+        for index, vcs_requirement in iter_vcs_requirements(requirements)
+        if markers_apply(vcs_requirement.markers)
+    ]
+    mirrors = {}
+    for _, vcs_requirement in vcs_requirements:
+        mirrors.setdefault(
+            vcs_requirement.url, mirror_path(directory, vcs_requirement.url)
+        )
+
+    logger.debug(f"Fetching {len(mirrors)} repositories with {jobs} workers")
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Consume the results, so errors of failed clones are raised here
+        list(executor.map(update, mirrors.keys(), mirrors.values()))
+
+    for index, vcs_requirement in vcs_requirements:
+        requirements[index] = format_vcs_requirement(
+            vcs_requirement._replace(url=f"file://{mirrors[vcs_requirement.url]}")
+        )
+    return requirements
+
+
+def prefetch_requirements(requirements, staging_dir, jobs=None):
+    """
+    Clone all git requirements concurrently, and point them to the local clones.
+    pip clones git requirements one at a time, so without prefetching the clone times add up.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param staging_dir: The directory to clone the repositories into.
+    :param jobs: The maximum number of concurrent clones, defaults to the number of CPUs.
+    :return: The requirements, with git requirements rewritten to git+file:// URLs of the local clones.
+    """
+    return _use_local_repositories(requirements, staging_dir, clone_mirror, jobs)
+
+
+def mirror_requirements(requirements, mirror_dir, jobs=None):
+    """
+    Keep a persistent bare mirror of every git requirement, and point the requirements to the mirrors.
+    Mirrors that exist already are updated with an incremental fetch, which is much faster than a full clone.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param mirror_dir: The directory to keep the mirrors in.
+    :param jobs: The maximum number of concurrent fetches, defaults to the number of CPUs.
+    :return: The requirements, with git requirements rewritten to git+file:// URLs of the mirrors.
+    """
+    os.makedirs(mirror_dir, exist_ok=True)
+    return _use_local_repositories(requirements, mirror_dir, _update_locked_mirror, jobs)
+
+
+def mirror_origins(requirements, mirror_dir):
+    """
+    Determine which repositories the URLs mirror_requirements rewrites git requirements to stand for.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param mirror_dir: The directory the mirrors are kept in.
+    :return: A dict mapping the file:// URLs of the mirrors to the original repository URLs.
+    """
+    return {
+        f"file://{mirror_path(mirror_dir, vcs_requirement.url)}": vcs_requirement.url
+        for _, vcs_requirement in iter_vcs_requirements(requirements)
+    }
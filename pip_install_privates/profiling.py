@@ -0,0 +1,165 @@
+import cProfile
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from pip_install_privates.vcs import strip_credentials
+
+logger = logging.getLogger(__name__)
+
+# Messages of pip that start working on (a requirement in) another activity. An activity lasts until the
+# next one starts, so the time between two of these messages is attributed to the first.
+PIP_ACTIVITIES = (
+    (re.compile(r"^(?:Collecting|Processing|Obtaining) (\S+)"), "collect"),
+    (re.compile(r"^Cloning (\S+)"), "clone"),
+    (re.compile(r"^Building wheel for (\S+)"), "build"),
+    (re.compile(r"^Installing (collected packages)"), "install"),
+)
+# Messages of pip that end the current activity without starting another one
+PIP_IDLE = re.compile(
+    r"^(?:Created wheel for|Building wheels for collected packages|Successfully installed)"
+)
+# pip logs the size of downloads that are not served from its HTTP cache, rounded as by its format_size
+PIP_DOWNLOAD = re.compile(r"^Downloading \S+ \(([\d.]+) (bytes|kB|MB)\)$")
+SIZE_UNITS = {"bytes": 1, "kB": 1000, "MB": 1000 * 1000}
+
+
+def _children_cpu_time():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class PipLogHandler(logging.Handler):
+    """
+    Time the activities of pip per requirement from the messages it logs while it runs in-process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.timings = {}
+        self.activity = None
+        self.started = None
+        self.downloaded_bytes = 0
+
+    def _finish_activity(self, now):
+        if self.activity:
+            subject, name = self.activity
+            timings = self.timings.setdefault(subject, {})
+            timings[name] = timings.get(name, 0.0) + now - self.started
+        self.activity = None
+
+    def emit(self, record):
+        now = time.perf_counter()
+        message = record.getMessage()
+        for pattern, name in PIP_ACTIVITIES:
+            match = pattern.match(message)
+            if match:
+                self._finish_activity(now)
+                subject = strip_credentials(match.group(1).rstrip("@"))
+                self.activity, self.started = (subject, name), now
+                return
+        if PIP_IDLE.match(message):
+            self._finish_activity(now)
+        download = PIP_DOWNLOAD.match(message)
+        if download:
+            self.downloaded_bytes += int(float(download.group(1)) * SIZE_UNITS[download.group(2)])
+
+    def close(self):
+        self._finish_activity(time.perf_counter())
+        super().close()
+
+
+class Profiler(object):
+    """
+    Record the wall time and CPU time of every phase of an installation. CPU time of subprocesses,
+    like git and builds in their own pip process, is recorded separately.
+    Optionally, the pip_install_privates code of the phases is profiled with cProfile.
+    """
+
+    def __init__(self, cprofile=False):
+        self.phases = {}
+        self.requirements = {}
+        self.downloaded_bytes = 0
+        self.profile = cProfile.Profile() if cprofile else None
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, profile=True):
+        """
+        Time a phase. Phases must not be nested, and the times of a phase that runs more than once add up.
+        :param name: The name of the phase.
+        :param profile: Whether to profile the phase with cProfile, if enabled.
+        """
+        profile = self.profile if profile else None
+        wall, cpu, children = time.perf_counter(), time.process_time(), _children_cpu_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            timings = self.phases.setdefault(
+                name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "child_cpu_s": 0.0}
+            )
+            timings["calls"] += 1
+            timings["wall_s"] += time.perf_counter() - wall
+            timings["cpu_s"] += time.process_time() - cpu
+            timings["child_cpu_s"] += _children_cpu_time() - children
+
+    @contextmanager
+    def pip_phase(self, name):
+        """
+        Time a phase that runs pip, and the activities of pip per requirement.
+        pip itself is not profiled with cProfile.
+        :param name: The name of the phase.
+        """
+        handler = PipLogHandler()
+        pip_logger = logging.getLogger("pip._internal")
+        pip_logger.addHandler(handler)
+        try:
+            with self.phase(name, profile=False):
+                yield
+        finally:
+            pip_logger.removeHandler(handler)
+            handler.close()
+            self.downloaded_bytes += handler.downloaded_bytes
+            for subject, timings in handler.timings.items():
+                requirement = self.requirements.setdefault(subject, {})
+                for activity, seconds in timings.items():
+                    requirement[activity] = requirement.get(activity, 0.0) + seconds
+
+    def report(self):
+        """
+        Describe the recorded timings.
+        :return: A dict with the total wall time, the timings per phase, the timings of pip per requirement
+            and the number of bytes pip downloaded.
+        """
+        return {
+            "downloaded_bytes": self.downloaded_bytes,
+            "wall_s": time.perf_counter() - self.started,
+            "phases": self.phases,
+            "requirements": self.requirements,
+        }
+
+    def write_report(self, path):
+        """
+        Write the recorded timings to a JSON file, with sorted keys so reports of different runs can be diffed.
+        :param path: The path of the report.
+        """
+        partial = f"{path}.partial.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+        os.replace(partial, path)
+        logger.debug(f"Wrote profile report to {path}")
+
+    def dump_stats(self, path):
+        """
+        Write the cProfile statistics, which can be read with pstats or tools like snakeviz.
+        :param path: The path of the statistics file.
+        """
+        self.profile.dump_stats(path)
+        logger.debug(f"Wrote cProfile statistics to {path}")
@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import html
+import logging
+import os
+import shutil
+import tempfile
+
+from pip_install_privates.satisfied import canonicalize_name
+from pip_install_privates.vcs import (
+    add_markers,
+    format_vcs_requirement,
+    parse_vcs_requirement,
+    strip_credentials,
+)
+from pip_install_privates.wheels import build_wheels_concurrently, use_wheel_cache
+
+logger = logging.getLogger(__name__)
+
+PINNED_REQUIREMENTS_NAME = "requirements.txt"
+
+
+def parse_wheel_filename(filename):
+    """
+    Read the project name and version from the file name of a wheel.
+    :param filename: The file name, like my_project-1.0-py3-none-any.whl.
+    :return: A tuple of the normalized project name and the version.
+    """
+    name, version = os.path.basename(filename).split("-")[:2]
+    return canonicalize_name(name), version
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_page(path, title, links):
+    body = "\n".join(
+        f'    <a href="{html.escape(href)}">{html.escape(text)}</a><br/>' for href, text in links
+    )
+    partial = f"{path}.partial.{os.getpid()}"
+    with open(partial, "w") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html>\n  <head><title>"
+            f"{html.escape(title)}</title></head>\n  <body>\n{body}\n  </body>\n</html>\n"
+        )
+    os.replace(partial, path)
+
+
+def write_simple_index(wheels, index_dir):
+    """
+    Add wheels to a static simple repository (PEP 503), which pip can use with --index-url file:///...
+    Wheels published earlier are kept, so an index can be updated incrementally.
+    :param wheels: The paths to the wheels to add.
+    :param index_dir: The directory of the index.
+    :return: The paths to the wheels in the index, in the order of the wheels.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    published = []
+    for wheel in wheels:
+        name, _ = parse_wheel_filename(wheel)
+        project_dir = os.path.join(index_dir, name)
+        os.makedirs(project_dir, exist_ok=True)
+        destination = os.path.join(project_dir, os.path.basename(wheel))
+        partial = f"{destination}.partial.{os.getpid()}"
+        shutil.copyfile(wheel, partial)
+        os.replace(partial, destination)
+        published.append(destination)
+
+    projects = sorted(
+        entry
+        for entry in os.listdir(index_dir)
+        if glob.glob(os.path.join(index_dir, entry, "*.whl"))
+    )
+    for project in projects:
+        files = sorted(glob.glob(os.path.join(index_dir, project, "*.whl")))
+        _write_page(
+            os.path.join(index_dir, project, "index.html"),
+            f"Links for {project}",
+            [(f"{os.path.basename(f)}#sha256={_sha256(f)}", os.path.basename(f)) for f in files],
+        )
+    _write_page(
+        os.path.join(index_dir, "index.html"),
+        "Simple index",
+        [(f"{project}/", project) for project in projects],
+    )
+    logger.debug(f"Published {len(published)} wheels to {index_dir}")
+    return published
+
+
+def _published_vcs_requirements(requirements):
+    # Unlike pip, the index can not install a project in editable mode, so editable git requirements
+    # are published as regular wheels instead of being left out
+    for index, requirement in enumerate(requirements):
+        vcs_requirement = parse_vcs_requirement(requirement)
+        if not vcs_requirement:
+            continue
+        if index and requirements[index - 1] in ("-e", "--editable"):
+            logger.debug(f"Publishing editable {strip_credentials(requirement)} as a regular wheel")
+        yield vcs_requirement
+
+
+def publish_requirements(requirements, index_dir, jobs=None, cache=None):
+    """
+    Build wheels for all git requirements in parallel, and publish them in a static simple repository.
+    Editable git requirements are published as regular wheels.
+    A requirements file pinning the published projects by name and version is written next to the index,
+    so installing them needs neither git, tokens nor builds.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param index_dir: The directory of the index.
+    :param jobs: The maximum number of concurrent builds, defaults to the number of CPUs.
+    :param cache: An optional WheelCache to reuse wheels built before from.
+    :return: The paths to the published wheels.
+    """
+    vcs_requirements = list(_published_vcs_requirements(requirements))
+    with tempfile.TemporaryDirectory() as wheelhouse:
+        if cache:
+            wheels = use_wheel_cache(
+                [format_vcs_requirement(v._replace(markers=None)) for v in vcs_requirements],
+                cache,
+                jobs,
+            )
+            missing = [w for w in wheels if not w.endswith(".whl")]
+            if missing:
+                raise RuntimeError(
+                    f"Error resolving {', '.join(strip_credentials(m) for m in missing)}"
+                )
+        else:
+            wheels = build_wheels_concurrently(
+                [format_vcs_requirement(v._replace(markers=None)) for v in vcs_requirements],
+                wheelhouse,
+                jobs,
+            )
+        published = write_simple_index(wheels, index_dir)
+
+    lines = []
+    for vcs_requirement, wheel in zip(vcs_requirements, published):
+        name, version = parse_wheel_filename(wheel)
+        lines.append(add_markers(f"{name}=={version}", vcs_requirement.markers))
+    partial = os.path.join(index_dir, f"{PINNED_REQUIREMENTS_NAME}.partial.{os.getpid()}")
+    with open(partial, "w") as f:
+        f.writelines(f"{line}\n" for line in lines)
+    os.replace(partial, os.path.join(index_dir, PINNED_REQUIREMENTS_NAME))
+    return published
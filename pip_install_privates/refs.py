@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import time
+
+from pip_install_privates.vcs import (
+    format_vcs_requirement,
+    is_commit_sha,
+    iter_vcs_requirements,
+    ls_remote_command,
+    parse_ls_remote,
+    strip_credentials,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REF_TTL = 300
+
+
+class RefCache(object):
+    """
+    A persistent cache of the commits branches and tags pointed to, which expire after a number of seconds.
+    Only commits are stored, so credentials in the repository URLs never end up on disk.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_REF_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(url, ref):
+        return f"{strip_credentials(url)}@{ref or 'HEAD'}"
+
+    def get(self, url, ref):
+        """
+        Find the commit a ref of a repository pointed to, if it was resolved less than ttl seconds ago.
+        :param url: The repository URL.
+        :param ref: The branch or tag, or None for the default branch.
+        :return: The commit SHA, or None if the ref is not cached or the entry expired.
+        """
+        entry = self.entries.get(self._key(url, ref))
+        if not entry or time.time() - entry["time"] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["commit"]
+
+    def set(self, url, ref, commit):
+        """
+        Remember the commit a ref of a repository points to.
+        :param url: The repository URL.
+        :param ref: The branch or tag, or None for the default branch.
+        :param commit: The commit SHA.
+        """
+        self.entries[self._key(url, ref)] = {"commit": commit, "time": time.time()}
+
+    def save(self):
+        """
+        Write the cache to disk, leaving out expired entries.
+        """
+        now = time.time()
+        entries = {
+            key: entry
+            for key, entry in self.entries.items()
+            if now - entry["time"] <= self.ttl
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        partial = f"{self.path}.partial.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump(entries, f)
+        os.replace(partial, self.path)
+
+
+async def resolve_commit_async(url, ref=None):
+    """
+    Resolve a branch or tag of a remote repository to a commit SHA, without blocking other lookups.
+    :param url: The repository URL.
+    :param ref: The branch, tag or commit SHA, or None for the default branch.
+    :return: The commit SHA, or None if the ref could not be resolved.
+    """
+    import asyncio
+
+    if is_commit_sha(ref):
+        return ref
+    process = await asyncio.create_subprocess_exec(
+        *ls_remote_command(url, ref),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"Error resolving {ref or 'HEAD'} of {strip_credentials(url)}: {stderr.decode().strip()}"
+        )
+    commit = parse_ls_remote(stdout.decode(), ref)
+    logger.debug(f"Resolved {ref or 'HEAD'} of {strip_credentials(url)} to {commit}")
+    return commit
+
+
+async def resolve_commits(lookups, jobs=None):
+    """
+    Resolve refs of remote repositories concurrently, so a slow host does not hold up the other lookups.
+    :param lookups: A list of (url, ref) tuples.
+    :param jobs: The maximum number of concurrent lookups, or None for no limit.
+    :return: A list of commit SHAs (or None for refs that could not be resolved), in the order of the lookups.
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(jobs) if jobs else None
+
+    async def resolve(url, ref):
+        if not semaphore:
+            return await resolve_commit_async(url, ref)
+        async with semaphore:
+            return await resolve_commit_async(url, ref)
+
+    return await asyncio.gather(*(resolve(url, ref) for url, ref in lookups))
+
+
+def pin_refs(requirements, cache=None, jobs=None):
+    """
+    Pin the branches and tags of git requirements to the commits they point to, before pip sees them.
+    This makes the requirements immutable, so caches keyed on the requirement or commit are exact.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param cache: An optional RefCache to reuse recent lookups from.
+    :param jobs: The maximum number of concurrent lookups, or None for no limit.
+    :return: The requirements, with the refs of git requirements replaced by commit SHAs.
+    """
+    requirements = list(requirements)
+    vcs_requirements = [
+        (index, vcs_requirement)
+        for index, vcs_requirement in iter_vcs_requirements(requirements)
+        if not is_commit_sha(vcs_requirement.ref)
+    ]
+
+    commits = {}
+    for _, vcs_requirement in vcs_requirements:
+        lookup = (vcs_requirement.url, vcs_requirement.ref)
+        if lookup not in commits:
+            commits[lookup] = cache.get(*lookup) if cache else None
+    missing = [lookup for lookup, commit in commits.items() if not commit]
+    logger.debug(
+        f"Resolving {len(missing)} refs, {len(commits) - len(missing)} were cached"
+    )
+    if missing:
+        # asyncio is slow to import, and install and the daemon import this module on every run
+        import asyncio
+
+        for lookup, commit in zip(missing, asyncio.run(resolve_commits(missing, jobs))):
+            commits[lookup] = commit
+            if cache and commit:
+                cache.set(*lookup, commit)
+        if cache:
+            cache.save()
+
+    for index, vcs_requirement in vcs_requirements:
+        commit = commits[(vcs_requirement.url, vcs_requirement.ref)]
+        if commit:
+            requirements[index] = format_vcs_requirement(vcs_requirement._replace(ref=commit))
+    return requirements
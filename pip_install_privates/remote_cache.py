@@ -0,0 +1,107 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import urllib.error
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+REMOTE_CACHE_TOKEN_VARIABLE = "PIP_INSTALL_PRIVATES_REMOTE_CACHE_TOKEN"
+
+
+class DirectoryBackend(object):
+    """
+    A shared wheel cache in a directory, i.e. on an NFS share or a mounted bucket that several runners use.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, key, destination):
+        """
+        Copy the wheel of a cache entry to a local directory.
+        :param key: The key of the cache entry, a relative path.
+        :param destination: The local directory to copy the wheel to.
+        :return: The path of the local copy, or None if the entry does not exist.
+        """
+        wheels = glob.glob(os.path.join(self.directory, key, "*.whl"))
+        if not wheels:
+            return None
+        local = os.path.join(destination, os.path.basename(wheels[0]))
+        shutil.copyfile(wheels[0], local)
+        return local
+
+    def upload(self, key, wheel):
+        """
+        Add a wheel to the shared cache.
+        :param key: The key of the cache entry, a relative path.
+        :param wheel: The path of the wheel.
+        """
+        directory = os.path.join(self.directory, key)
+        os.makedirs(directory, exist_ok=True)
+        shared = os.path.join(directory, os.path.basename(wheel))
+        partial = f"{shared}.partial.{os.getpid()}"
+        shutil.copyfile(wheel, partial)
+        os.replace(partial, shared)
+
+
+class HttpBackend(object):
+    """
+    A shared wheel cache behind an HTTP endpoint that supports GET and PUT, i.e. a WebDAV share or an
+    object store. Every entry consists of the wheel and an index.json naming it, which is uploaded last.
+    If PIP_INSTALL_PRIVATES_REMOTE_CACHE_TOKEN is set, it is sent as a bearer token.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def _request(self, path, method="GET", data=None):
+        request = urllib.request.Request(f"{self.url}/{path}", data=data, method=method)
+        token = os.environ.get(REMOTE_CACHE_TOKEN_VARIABLE)
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+        return urllib.request.urlopen(request, timeout=60)
+
+    def fetch(self, key, destination):
+        """
+        Download the wheel of a cache entry to a local directory.
+        :param key: The key of the cache entry, a relative path.
+        :param destination: The local directory to download the wheel to.
+        :return: The path of the downloaded wheel, or None if the entry does not exist.
+        """
+        try:
+            with self._request(f"{key}/index.json") as response:
+                filename = os.path.basename(json.load(response)["filename"])
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        local = os.path.join(destination, filename)
+        with self._request(f"{key}/{filename}") as response, open(local, "wb") as f:
+            shutil.copyfileobj(response, f)
+        return local
+
+    def upload(self, key, wheel):
+        """
+        Add a wheel to the shared cache.
+        :param key: The key of the cache entry, a relative path.
+        :param wheel: The path of the wheel.
+        """
+        filename = os.path.basename(wheel)
+        with open(wheel, "rb") as f:
+            self._request(f"{key}/{filename}", method="PUT", data=f.read()).close()
+        index = json.dumps({"filename": filename}).encode("utf-8")
+        self._request(f"{key}/index.json", method="PUT", data=index).close()
+
+
+def open_remote_cache(location):
+    """
+    Get the shared wheel cache backend for a location.
+    :param location: An http(s) URL, or the path of a directory.
+    :return: An HttpBackend or a DirectoryBackend.
+    """
+    if location.startswith(("http://", "https://")):
+        return HttpBackend(location)
+    return DirectoryBackend(location)
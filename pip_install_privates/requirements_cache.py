@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+
+from pip_install_privates.includes import file_key, iter_includes
+
+logger = logging.getLogger(__name__)
+
+# Bump when the format of the entries, or the way requirements are transformed, changes
+CACHE_VERSION = 2
+
+GITHUB_TOKEN_PLACEHOLDER = "${GITHUB_TOKEN}"
+CI_JOB_TOKEN_PLACEHOLDER = "${CI_JOB_TOKEN}"
+
+
+def hash_include_tree(fname, *fnames):
+    """
+    Hash the contents of requirements files and of all files they (indirectly) include.
+    :param fname: The path to the requirements file.
+    :param fnames: The paths to more requirements files that are collected together with it.
+    :return: A dict mapping the file_key of every file in the tree to the SHA-256 of its contents,
+        or None if one of the files does not exist (anymore).
+    """
+    hashes = {}
+    pending = [fname] + list(fnames)
+    while pending:
+        path = pending.pop()
+        if file_key(path) in hashes:
+            continue
+        try:
+            with open(path, "rb") as reqs:
+                contents = reqs.read()
+        except FileNotFoundError:
+            return None
+        hashes[file_key(path)] = hashlib.sha256(contents).hexdigest()
+        lines = contents.decode("utf-8", errors="replace").splitlines()
+        pending.extend(iter_includes(path, lines))
+    return hashes
+
+
+def _fnames(fname):
+    return list(fname) if isinstance(fname, (list, tuple)) else [fname]
+
+
+def _credential_replacements(transform_with_token=None, ci_job_token=None, **options):
+    replacements = []
+    if transform_with_token:
+        replacements.append(
+            (
+                f"{transform_with_token}:x-oauth-basic@",
+                f"{GITHUB_TOKEN_PLACEHOLDER}:x-oauth-basic@",
+            )
+        )
+    if ci_job_token:
+        replacements.append(
+            (f"gitlab-ci-token:{ci_job_token}@", f"gitlab-ci-token:{CI_JOB_TOKEN_PLACEHOLDER}@")
+        )
+    return replacements
+
+
+class RequirementsCache(object):
+    """
+    A persistent cache of the transformed requirements of a requirements file, or of files collected together.
+    An entry is only used while none of the files in the -r tree changed. Tokens are never
+    stored: they are replaced by placeholders, which are filled in again when an entry is used.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, fname, options):
+        project_names = options.get("project_names")
+        if project_names is None:
+            project_names = os.environ.get("PROJECT_NAMES", "")
+        key = {
+            "version": CACHE_VERSION,
+            "files": [file_key(name) for name in _fnames(fname)],
+            "gitlab_domain": options.get("gitlab_domain"),
+            "github_root_dir": options.get("github_root_dir"),
+            "project_names": project_names,
+            "github_token": bool(options.get("transform_with_token")),
+            "ci_job_token": bool(options.get("ci_job_token")),
+        }
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8"))
+        return os.path.join(self.directory, f"{digest.hexdigest()}.json")
+
+    def load(self, fname, options):
+        """
+        Get the cached requirements of a requirements file.
+        :param fname: The path to the requirements file, or a list of paths of files collected together.
+        :param options: The keyword arguments that would be passed to collect_requirements.
+        :return: The transformed requirements, or None if they are not cached or a file has changed.
+        """
+        try:
+            with open(self._entry_path(fname, options)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("files") != hash_include_tree(*_fnames(fname)):
+            logger.debug(f"Cached requirements of {fname} are outdated")
+            self.misses += 1
+            return None
+        logger.debug(f"Using cached requirements of {fname}")
+        self.hits += 1
+        requirements = entry["requirements"]
+        for value, placeholder in _credential_replacements(**options):
+            requirements = [r.replace(placeholder, value) for r in requirements]
+        return requirements
+
+    def store(self, fname, options, requirements):
+        """
+        Cache the transformed requirements of a requirements file.
+        :param fname: The path to the requirements file, or a list of paths of files collected together.
+        :param options: The keyword arguments that were passed to collect_requirements.
+        :param requirements: The transformed requirements.
+        """
+        files = hash_include_tree(*_fnames(fname))
+        if files is None:
+            return
+        for value, placeholder in _credential_replacements(**options):
+            requirements = [r.replace(value, placeholder) for r in requirements]
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._entry_path(fname, options)
+        partial = f"{path}.partial.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump({"files": files, "requirements": requirements}, f)
+        os.replace(partial, path)
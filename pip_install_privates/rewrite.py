@@ -0,0 +1,167 @@
+import logging
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+GITHUB_DOMAIN = "github.com"
+GITLAB_DEFAULT_DOMAIN = "gitlab.com"
+
+# The ways a git URL can refer to a host, i.e. git+ssh://git@github.com/, git+git@github.com: and
+# git+https://github.com/. Every style gets its own named group for the host.
+URL_STYLES = (
+    ("ssh", r"git\+ssh://git@", "/"),
+    ("git", r"git\+git@", ":"),
+    ("https", r"git\+https://", "/"),
+)
+
+
+@lru_cache(maxsize=None)
+def compile_url_pattern(hosts, styles=("ssh", "git", "https")):
+    """
+    Compile a single regular expression that matches git URLs of any of the hosts, in any of the styles.
+    :param hosts: A tuple of host names (a host may include a path, i.e. group.company/root).
+    :param styles: The URL styles to match, see URL_STYLES.
+    :return: A compiled pattern with the host in a group named after the style, and the remainder in 'rest'.
+    """
+    # Try longer hosts first, so gitlab.com/group is not mistaken for gitlab.com
+    alternatives = "|".join(
+        re.escape(host) for host in sorted(set(hosts), key=len, reverse=True)
+    )
+    prefixes = "|".join(
+        f"{prefix}(?P<{style}>{alternatives}){re.escape(separator)}"
+        for style, prefix, separator in URL_STYLES
+        if style in styles
+    )
+    return re.compile(f"^(?:{prefixes})(?P<rest>.*)$", re.DOTALL)
+
+
+def match_url(pattern, url):
+    """
+    Match a URL against a pattern compiled with compile_url_pattern.
+    :return: A tuple of (style, host, rest), or None if the URL does not match.
+    """
+    match = pattern.match(url)
+    if not match:
+        return None
+    groups = match.groupdict()
+    for style, _, _ in URL_STYLES:
+        if groups.get(style) is not None:
+            return style, groups[style], groups["rest"]
+    return None
+
+
+class UrlRewriter(object):
+    """
+    Rewrites git URLs of GitHub and GitLab in a single pass.
+    All prefix, host and root dir rules are compiled into one pattern when the rewriter is created,
+    after which every URL is classified by its host and rewritten by the rule for that host.
+    """
+
+    def __init__(
+        self,
+        github_token=None,
+        gitlab_domain=None,
+        ci_job_token=None,
+        github_root_dir=None,
+        project_names=(),
+    ):
+        self.github_token = github_token
+        self.gitlab_domain = gitlab_domain
+        self.ci_job_token = ci_job_token
+        # The CI job token belongs to a single GitLab instance, so it is never sent to gitlab.com
+        # when a self-hosted instance is configured
+        self.token_host = gitlab_domain or GITLAB_DEFAULT_DOMAIN
+
+        gitlab_hosts = {GITLAB_DEFAULT_DOMAIN, self.token_host}
+        self.rules = {host: self._rewrite_gitlab for host in gitlab_hosts}
+        self.rules[GITHUB_DOMAIN] = self._rewrite_github
+        self.pattern = compile_url_pattern(tuple(sorted(self.rules)))
+
+        # GitHub repositories that have been moved to the GitLab domain, i.e. ByteInternet/my-project.
+        # Projects are looked up by their exact repository name, so thousands of names cost a single set lookup.
+        self.project_names = frozenset(name for name in project_names if name)
+        self.moved_to_gitlab = None
+        if github_root_dir and gitlab_domain and self.project_names:
+            self.moved_to_gitlab = re.compile(
+                f"^{re.escape(github_root_dir)}/"
+                r"(?P<repository>(?P<name>[^/@#]+?)(?:\.git)?(?:[/@#].*)?)$",
+                re.DOTALL,
+            )
+
+    def rewrite(self, url, ssh_agent=False):
+        """
+        Rewrite a git URL to a git+https URL, with a token if one is configured for its host.
+        :param url: The URL to rewrite.
+        :param ssh_agent: Leave git+ssh:// URLs of gitlab.com without a token alone, so an SSH agent can
+            authenticate them. Plain requirement lines are left to the SSH agent, editables and lines with
+            environment markers are not.
+        :return: The rewritten URL, or the URL itself if it is not a GitHub or GitLab git URL.
+        """
+        matched = match_url(self.pattern, url)
+        if not matched:
+            return url
+        style, host, rest = matched
+        return self.rules[host](url, style, host, rest, ssh_agent)
+
+    def move_to_gitlab(self, url):
+        """
+        Rewrite a GitHub URL of a project that has been moved to the GitLab domain.
+        :param url: The URL to rewrite.
+        :return: The GitLab URL, or None if the URL is not of a moved project.
+        """
+        matched = match_url(self.pattern, url)
+        if not matched or matched[1] != GITHUB_DOMAIN:
+            return None
+        return self._move_to_gitlab(url, *matched)
+
+    def _move_to_gitlab(self, url, style, host, rest):
+        if not self.moved_to_gitlab:
+            return None
+        moved = self.moved_to_gitlab.match(rest)
+        if not moved or moved.group("name") not in self.project_names:
+            return None
+        logger.debug("Transformed GitHub to GitLab URL")
+        return self._rewrite_gitlab(
+            url, style, self.gitlab_domain, moved.group("repository")
+        )
+
+    def _rewrite_github(self, url, style, host, rest, ssh_agent=False):
+        moved = self._move_to_gitlab(url, style, host, rest)
+        if moved:
+            return moved
+        if self.github_token:
+            return f"git+https://{self.github_token}:x-oauth-basic@{host}/{rest}"
+        if style != "https":
+            return f"git+https://{host}/{rest}"
+        return url
+
+    def _rewrite_gitlab(self, url, style, host, rest, ssh_agent=False):
+        if self.ci_job_token and host == self.token_host:
+            return f"git+https://gitlab-ci-token:{self.ci_job_token}@{host}/{rest}"
+        if style == "https" or (ssh_agent and style == "ssh" and host == GITLAB_DEFAULT_DOMAIN):
+            return url
+        # pip can not parse the scp-like git+git@host: style at all, so it is always rewritten
+        return f"git+https://{host}/{rest}"
+
+
+@lru_cache(maxsize=32)
+def get_rewriter(
+    github_token=None,
+    gitlab_domain=None,
+    ci_job_token=None,
+    github_root_dir=None,
+    project_names=(),
+):
+    """
+    Get a UrlRewriter for a set of options, compiling its rules only the first time.
+    :param project_names: A tuple of project names.
+    :return: A UrlRewriter.
+    """
+    return UrlRewriter(
+        github_token=github_token,
+        gitlab_domain=gitlab_domain,
+        ci_job_token=ci_job_token,
+        github_root_dir=github_root_dir,
+        project_names=project_names,
+    )
@@ -0,0 +1,198 @@
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from pip_install_privates.vcs import (
+    markers_apply,
+    parse_vcs_requirement,
+    project_name,
+    resolve_commit,
+    strip_credentials,
+)
+
+logger = logging.getLogger(__name__)
+
+# pip options that take the next argument as their value, which therefore is not a requirement
+OPTIONS_WITH_VALUE = (
+    "-i",
+    "--index-url",
+    "--extra-index-url",
+    "-f",
+    "--find-links",
+    "-c",
+    "--constraint",
+    "--trusted-host",
+    "--no-binary",
+    "--only-binary",
+)
+
+
+def canonicalize_name(name):
+    """
+    Normalize a project name as described in PEP 503, so differently written names compare equal.
+    :param name: The project name.
+    :return: The normalized name.
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def installed_distributions():
+    """
+    Find the distributions installed in the running environment, which is the one pip installs into.
+    :return: A dict mapping normalized project names to their importlib.metadata Distribution.
+    """
+    # importlib.metadata is slow to import, so only import it once the environment is inspected
+    from importlib import metadata
+
+    distributions = {}
+    for distribution in metadata.distributions():
+        name = distribution.metadata["Name"]
+        if name:
+            distributions.setdefault(canonicalize_name(name), distribution)
+    return distributions
+
+
+def installed_vcs_commit(distribution):
+    """
+    Read the repository and commit a distribution was installed from, as recorded by pip (PEP 610).
+    :param distribution: The importlib.metadata Distribution.
+    :return: A tuple of the repository URL without credentials and the commit SHA, or None if the
+        distribution was not installed from a git repository.
+    """
+    try:
+        direct_url = json.loads(distribution.read_text("direct_url.json") or "null")
+    except ValueError:
+        return None
+    if not direct_url or direct_url.get("vcs_info", {}).get("vcs") != "git":
+        return None
+    return strip_credentials(direct_url["url"]), direct_url["vcs_info"].get("commit_id")
+
+
+def iter_requirement_indexes(requirements):
+    """
+    Find the arguments that are requirements, rather than pip options or their values.
+    :param requirements: The requirements as returned by collect_requirements.
+    :return: An iterator of the indexes of the requirements, including editable ones.
+    """
+    for index, requirement in enumerate(requirements):
+        if requirement.startswith("-"):
+            continue
+        if index and requirements[index - 1] in OPTIONS_WITH_VALUE:
+            continue
+        yield index
+
+
+def can_skip(requirements, index):
+    """
+    Determine if a requirement may be left out of the arguments to pip.
+    Editable requirements are always reinstalled, and requirements with hashes are left alone
+    since leaving out the requirement would leave its --hash options behind.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param index: The index of the requirement.
+    :return: True if the requirement may be left out, False otherwise.
+    """
+    if index and requirements[index - 1] in ("-e", "--editable"):
+        return False
+    following = requirements[index + 1] if index + 1 < len(requirements) else ""
+    return not following.startswith("--hash")
+
+
+def _specifier_satisfied(requirement, distributions):
+    from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+
+    try:
+        parsed = Requirement(requirement)
+    except InvalidRequirement:
+        return False
+    if parsed.marker and not parsed.marker.evaluate():
+        return True
+    # Direct references and extras (which pull in more dependencies) are left to pip
+    if parsed.url or parsed.extras:
+        return False
+    distribution = distributions.get(canonicalize_name(parsed.name))
+    if not distribution:
+        return False
+    return parsed.specifier.contains(distribution.version, prereleases=True)
+
+
+def requirement_name(requirement):
+    """
+    Determine the project a requirement installs.
+    :param requirement: A requirement as returned by collect_requirements.
+    :return: The normalized project name, or None if it cannot be determined without building the requirement.
+    """
+    from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+
+    vcs_requirement = parse_vcs_requirement(requirement)
+    if vcs_requirement:
+        name = project_name(vcs_requirement)
+        return canonicalize_name(name) if name else None
+    try:
+        return canonicalize_name(Requirement(requirement).name)
+    except InvalidRequirement:
+        return None
+
+
+def _installed_commit(vcs_requirement, distribution, manifest):
+    url = strip_credentials(vcs_requirement.url)
+    installed = installed_vcs_commit(distribution)
+    if installed and installed[0] == url:
+        return installed[1]
+    # pip does not record the repository of wheels from the wheel cache, and records local mirrors and
+    # prefetched checkouts instead of the repository, so fall back to what was recorded in the manifest
+    entry = manifest.get(canonicalize_name(distribution.metadata["Name"]))
+    if not entry or entry["version"] != distribution.version:
+        return None
+    recorded = parse_vcs_requirement(entry["requirement"])
+    if not recorded or strip_credentials(recorded.url) != url:
+        return None
+    return entry["commit"]
+
+
+def drop_satisfied(requirements, jobs=None, manifest=None):
+    """
+    Leave out the requirements the environment already satisfies, so pip does not check or reinstall them.
+    A requirement is satisfied if the installed version matches its version specifier, or for git requirements,
+    if the distribution was installed from the commit the requirement's ref currently points to, as recorded by
+    pip or in the manifest. Dependencies of satisfied requirements are not checked again.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param jobs: The maximum number of concurrent git ref lookups, defaults to the number of CPUs.
+    :param manifest: The manifest as returned by sync.load_manifest, to look up the commits of git requirements
+        pip did not record.
+    :return: The requirements that are not satisfied yet.
+    """
+    distributions = installed_distributions()
+    satisfied = set()
+    vcs_lookups = []
+    for index in iter_requirement_indexes(requirements):
+        if not can_skip(requirements, index):
+            continue
+        vcs_requirement = parse_vcs_requirement(requirements[index])
+        if not vcs_requirement:
+            if _specifier_satisfied(requirements[index], distributions):
+                satisfied.add(index)
+        elif not markers_apply(vcs_requirement.markers):
+            satisfied.add(index)
+        else:
+            name = project_name(vcs_requirement)
+            distribution = distributions.get(canonicalize_name(name or ""))
+            installed = distribution and _installed_commit(vcs_requirement, distribution, manifest or {})
+            if installed:
+                vcs_lookups.append((index, vcs_requirement, installed))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        commits = list(
+            executor.map(
+                resolve_commit,
+                [v.url for _, v, _ in vcs_lookups],
+                [v.ref for _, v, _ in vcs_lookups],
+            )
+        )
+    for (index, _, installed_commit), commit in zip(vcs_lookups, commits):
+        if commit and commit == installed_commit:
+            satisfied.add(index)
+
+    for index in sorted(satisfied):
+        logger.debug(f"Skipping {strip_credentials(requirements[index])}, it is already installed")
+    return [r for index, r in enumerate(requirements) if index not in satisfied]
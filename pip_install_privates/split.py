@@ -0,0 +1,88 @@
+import logging
+import os
+from functools import lru_cache
+
+from pip_install_privates.satisfied import OPTIONS_WITH_VALUE
+
+logger = logging.getLogger(__name__)
+
+PUBLIC = "public"
+PRIVATE = "private"
+OPTION = "option"
+
+
+# Parsing a requirement is slow, and the same requirements come back in every file that includes a common base
+@lru_cache(maxsize=None)
+def is_public_requirement(requirement):
+    """
+    Determine if a requirement is installed from a package index by name, and therefore changes rarely.
+    Git requirements, direct URLs and local paths are private.
+    :param requirement: A requirement as returned by collect_requirements.
+    :return: True if the requirement is public, False otherwise.
+    """
+    from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+
+    try:
+        return not Requirement(requirement).url
+    except InvalidRequirement:
+        return False
+
+
+def group_requirements(requirements):
+    """
+    Group the arguments returned by collect_requirements into lines of a requirements file.
+    Editable requirements are grouped with their -e, options with their value, and --hash options with
+    the requirement they belong to.
+    :param requirements: The requirements as returned by collect_requirements.
+    :return: A list of (kind, tokens) tuples, where kind is PUBLIC, PRIVATE or OPTION.
+    """
+    groups = []
+    tokens = iter(requirements)
+    for token in tokens:
+        if token in ("-e", "--editable"):
+            groups.append((PRIVATE, [token, next(tokens, "")]))
+        elif token.startswith("--hash") and groups and groups[-1][0] != OPTION:
+            groups[-1][1].append(token)
+            if token == "--hash":
+                groups[-1][1].append(next(tokens, ""))
+        elif token in OPTIONS_WITH_VALUE:
+            groups.append((OPTION, [token, next(tokens, "")]))
+        elif token.startswith("-"):
+            groups.append((OPTION, [token]))
+        else:
+            groups.append((PUBLIC if is_public_requirement(token) else PRIVATE, [token]))
+    return groups
+
+
+def split_requirements(requirements):
+    """
+    Partition requirements into the public ones, which change rarely, and the private ones, which change often.
+    Options like --index-url apply to both partitions, so they are kept in both.
+    :param requirements: The requirements as returned by collect_requirements.
+    :return: A tuple of the public and the private requirements, in the format of collect_requirements.
+    """
+    partitions = {PUBLIC: [], PRIVATE: []}
+    for kind, tokens in group_requirements(requirements):
+        for partition in (PUBLIC, PRIVATE) if kind == OPTION else (kind,):
+            partitions[partition].extend(tokens)
+    logger.debug(
+        f"Split requirements into {len(partitions[PUBLIC])} public and "
+        f"{len(partitions[PRIVATE])} private arguments"
+    )
+    return partitions[PUBLIC], partitions[PRIVATE]
+
+
+def write_requirements_file(requirements, fname):
+    """
+    Write requirements to a file pip understands with -r.
+    :param requirements: The requirements in the format of collect_requirements.
+    :param fname: The path of the file.
+    """
+    partial = f"{fname}.partial.{os.getpid()}"
+    with open(partial, "w") as f:
+        for _, tokens in group_requirements(requirements):
+            if tokens[0] in ("-e", "--editable") and " " in tokens[1]:
+                # pip splits option lines like a shell, so quote editables with environment markers
+                tokens = [tokens[0], f"'{tokens[1]}'"]
+            f.write(" ".join(tokens) + "\n")
+    os.replace(partial, fname)
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pip_install_privates.satisfied import (
+    can_skip,
+    installed_distributions,
+    installed_vcs_commit,
+    iter_requirement_indexes,
+    requirement_name,
+)
+from pip_install_privates.vcs import (
+    is_commit_sha,
+    parse_vcs_requirement,
+    resolve_commit,
+    strip_credentials,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "pip-install-privates-manifest.json"
+
+
+def default_manifest_path():
+    """
+    Determine where the manifest of the running environment is kept, which is the one pip installs into.
+    :return: The path of the manifest.
+    """
+    return os.path.join(sys.prefix, MANIFEST_NAME)
+
+
+def load_manifest(path):
+    """
+    Read what the last successful sync installed.
+    :param path: The path of the manifest.
+    :return: A dict mapping normalized project names to dicts with the requirement, version and commit,
+        which is empty if there is no (valid) manifest.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)["requirements"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_manifest(path, entries):
+    """
+    Record what a successful sync installed.
+    :param path: The path of the manifest.
+    :param entries: The entries as returned by manifest_entries.
+    """
+    partial = f"{path}.partial.{os.getpid()}"
+    with open(partial, "w") as f:
+        json.dump({"requirements": entries}, f, indent=2, sort_keys=True)
+    os.replace(partial, path)
+
+
+def manifest_entries(requirements):
+    """
+    Describe the installed distributions of the requirements.
+    :param requirements: The requirements as returned by collect_requirements.
+    :return: A dict mapping normalized project names to dicts with the requirement (without credentials),
+        the installed version and the commit it was installed from, if it was installed from git.
+    """
+    distributions = installed_distributions()
+    entries = {}
+    for index in iter_requirement_indexes(requirements):
+        name = requirement_name(requirements[index])
+        distribution = distributions.get(name) if name else None
+        if not distribution:
+            continue
+        vcs_requirement = parse_vcs_requirement(requirements[index])
+        if vcs_requirement and is_commit_sha(vcs_requirement.ref):
+            # Wheels from the wheel cache and prefetched checkouts are not recorded as git installs by pip,
+            # so the pinned ref is the only record of the commit they were built from
+            commit = vcs_requirement.ref
+        else:
+            installed = installed_vcs_commit(distribution)
+            commit = installed[1] if installed else None
+        entries[name] = {
+            "requirement": strip_credentials(requirements[index]),
+            "version": distribution.version,
+            "commit": commit,
+        }
+    return entries
+
+
+def plan_sync(requirements, manifest, jobs=None):
+    """
+    Compare the requirements to what the last sync installed.
+    A requirement is unchanged if it is written the same, its distribution is still installed in the same version,
+    and for git requirements, its ref still points to the commit that was installed.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param manifest: The manifest as returned by load_manifest.
+    :param jobs: The maximum number of concurrent git ref lookups, defaults to the number of CPUs.
+    :return: A tuple of the requirements that were added or changed, and the names of the projects that were removed.
+    """
+    distributions = installed_distributions()
+    names = set()
+    unchanged = set()
+    vcs_lookups = []
+    for index in iter_requirement_indexes(requirements):
+        name = requirement_name(requirements[index])
+        if not name:
+            continue
+        names.add(name)
+        entry = manifest.get(name)
+        distribution = distributions.get(name)
+        if (
+            not entry
+            or not distribution
+            or not can_skip(requirements, index)
+            or entry["requirement"] != strip_credentials(requirements[index])
+            or entry["version"] != distribution.version
+        ):
+            continue
+        vcs_requirement = parse_vcs_requirement(requirements[index])
+        if vcs_requirement:
+            vcs_lookups.append((index, vcs_requirement, entry["commit"]))
+        else:
+            unchanged.add(index)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        commits = list(
+            executor.map(
+                resolve_commit,
+                [v.url for _, v, _ in vcs_lookups],
+                [v.ref for _, v, _ in vcs_lookups],
+            )
+        )
+    for (index, _, installed_commit), commit in zip(vcs_lookups, commits):
+        if commit and commit == installed_commit:
+            unchanged.add(index)
+
+    removed = sorted(set(manifest) - names)
+    logger.debug(
+        f"{len(unchanged)} requirements are unchanged since the last sync, {len(removed)} were removed"
+    )
+    return [r for index, r in enumerate(requirements) if index not in unchanged], removed
@@ -0,0 +1,281 @@
+import logging
+import os
+import re
+import subprocess
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+# The separator collect_requirements puts between a requirement and its pip environment markers
+MARKER_SEPARATOR = " ; "
+
+# Matches PEP 508 direct references to git repositories, i.e. my-project[extra] @ git+https://...
+DIRECT_REFERENCE_PATTERN = re.compile(r"^(?!git\+)([^@\s]+)\s*@\s*(git\+.*)$")
+
+# The name is only set for PEP 508 direct references, and includes their extras
+VcsRequirement = namedtuple(
+    "VcsRequirement", ["url", "ref", "fragment", "markers", "name"], defaults=(None,)
+)
+
+
+def parse_vcs_requirement(requirement):
+    """
+    Split a collected git requirement into its repository URL, ref, fragment and environment markers.
+    :param requirement: A requirement as returned by collect_requirements, i.e.
+        git+https://github.com/MyOrg/my-project.git@my-tag#egg=my_project ; python_version=="3.7"
+        or a PEP 508 direct reference like my_project @ git+https://github.com/MyOrg/my-project.git@my-tag
+    :return: A VcsRequirement, or None if the requirement is not a git URL.
+    """
+    name = None
+    direct_reference = DIRECT_REFERENCE_PATTERN.match(requirement.strip())
+    if direct_reference:
+        name, requirement = direct_reference.groups()
+    if not requirement.startswith("git+") or "://" not in requirement:
+        return None
+    requirement, _, markers = requirement.partition(MARKER_SEPARATOR)
+    location, _, fragment = requirement.strip().partition("#")
+    scheme, netloc, path, query, _ = urlsplit(location[len("git+"):])
+    ref = None
+    if "@" in path:
+        path, ref = path.rsplit("@", 1)
+    return VcsRequirement(
+        url=urlunsplit((scheme, netloc, path, query, "")),
+        ref=ref or None,
+        fragment=fragment or None,
+        markers=markers.strip() or None,
+        name=name,
+    )
+
+
+def format_vcs_requirement(vcs_requirement):
+    """
+    Turn a VcsRequirement back into a requirement pip understands.
+    :param vcs_requirement: The VcsRequirement to format.
+    :return: The git requirement as a string.
+    """
+    requirement = f"git+{vcs_requirement.url}"
+    if vcs_requirement.ref:
+        requirement = f"{requirement}@{vcs_requirement.ref}"
+    if vcs_requirement.fragment:
+        requirement = f"{requirement}#{vcs_requirement.fragment}"
+    if vcs_requirement.name:
+        requirement = f"{vcs_requirement.name} @ {requirement}"
+    return add_markers(requirement, vcs_requirement.markers)
+
+
+def add_markers(requirement, markers):
+    """
+    Append pip environment markers to a requirement, if there are any.
+    :param requirement: The requirement to append the markers to.
+    :param markers: The environment markers, or None.
+    :return: The requirement with the markers appended.
+    """
+    return f"{requirement}{MARKER_SEPARATOR}{markers}" if markers else requirement
+
+
+def markers_apply(markers):
+    """
+    Evaluate pip environment markers against the running interpreter.
+    :param markers: The environment markers, or None.
+    :return: True if the requirement applies to this environment, False otherwise.
+    """
+    # Only evaluating markers needs pip's vendored packaging, which is slow to import
+    from pip._vendor.packaging.markers import Marker
+
+    return not markers or Marker(markers).evaluate()
+
+
+def egg_name(vcs_requirement):
+    """
+    Get the project name from the #egg= fragment of a git requirement.
+    :param vcs_requirement: The VcsRequirement to get the name from.
+    :return: The project name, or None if there is no #egg= fragment.
+    """
+    return _fragment_value(vcs_requirement, "egg")
+
+
+def project_name(vcs_requirement):
+    """
+    Get the project name of a git requirement, from a PEP 508 direct reference or the #egg= fragment.
+    :param vcs_requirement: The VcsRequirement to get the name from.
+    :return: The project name, or None if it cannot be determined without building the requirement.
+    """
+    if vcs_requirement.name:
+        return vcs_requirement.name.split("[")[0]
+    return egg_name(vcs_requirement)
+
+
+def subdirectory(vcs_requirement):
+    """
+    Get the directory of the project within the repository from the #subdirectory= fragment.
+    :param vcs_requirement: The VcsRequirement to get the subdirectory from.
+    :return: The subdirectory, or None if the project is in the root of the repository.
+    """
+    return _fragment_value(vcs_requirement, "subdirectory")
+
+
+def _fragment_value(vcs_requirement, name):
+    for part in (vcs_requirement.fragment or "").split("&"):
+        key, _, value = part.partition("=")
+        if key == name and value:
+            return value
+    return None
+
+
+def strip_credentials(url):
+    """
+    Remove any user name, password or token from a URL.
+    :param url: The URL to strip.
+    :return: The URL without credentials.
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    if "@" not in netloc:
+        # Leave the URL as it is, urlunsplit would turn file:///path into file:/path
+        return url
+    return urlunsplit((scheme, netloc.rpartition("@")[2], path, query, fragment))
+
+
+def is_commit_sha(ref):
+    """
+    Determine if a ref is a full commit SHA, which is immutable unlike branches and tags.
+    :param ref: The ref to check.
+    :return: True if the ref is a full commit SHA, False otherwise.
+    """
+    return bool(ref and COMMIT_SHA_PATTERN.match(ref))
+
+
+def iter_vcs_requirements(requirements):
+    """
+    Find the git requirements pip will install from a clone, skipping editable ones.
+    :param requirements: The requirements as returned by collect_requirements.
+    :return: An iterator of (index, VcsRequirement) tuples.
+    """
+    for index, requirement in enumerate(requirements):
+        if index and requirements[index - 1] in ("-e", "--editable"):
+            continue
+        vcs_requirement = parse_vcs_requirement(requirement)
+        if vcs_requirement:
+            yield index, vcs_requirement
+
+
+def ls_remote_command(url, ref):
+    """
+    Build the git command that lists the commits a ref points to.
+    :param url: The repository URL.
+    :param ref: The branch or tag, or None for the default branch.
+    :return: The command as a list of arguments.
+    """
+    if not ref:
+        return ["git", "ls-remote", url, "HEAD"]
+    return ["git", "ls-remote", url, ref, f"{ref}^{{}}"]
+
+
+def parse_ls_remote(output, ref):
+    """
+    Pick the commit a ref points to from git ls-remote output, peeling annotated tags.
+    :param output: The output of the command built by ls_remote_command.
+    :param ref: The branch or tag that was looked up, or None for the default branch.
+    :return: The commit SHA, or None if the ref does not exist.
+    """
+    candidates = {}
+    for line in output.splitlines():
+        sha, _, name = line.partition("\t")
+        candidates[name.strip()] = sha.strip()
+    if not ref:
+        return candidates.get("HEAD")
+    for name in (
+        f"refs/tags/{ref}^{{}}",
+        f"refs/tags/{ref}",
+        f"refs/heads/{ref}",
+        f"{ref}^{{}}",
+        ref,
+    ):
+        if name in candidates:
+            return candidates[name]
+    return None
+
+
+def resolve_commit(url, ref=None):
+    """
+    Resolve a branch or tag of a remote repository to the commit SHA it currently points to.
+    :param url: The repository URL.
+    :param ref: The branch, tag or commit SHA, or None for the default branch.
+    :return: The commit SHA, or None if the ref could not be resolved (i.e. an abbreviated SHA).
+    """
+    if is_commit_sha(ref):
+        return ref
+    try:
+        output = subprocess.run(
+            ls_remote_command(url, ref),
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(
+            f"Error resolving {ref or 'HEAD'} of {strip_credentials(url)}: {e.stderr.strip()}"
+        )
+    commit = parse_ls_remote(output, ref)
+    logger.debug(f"Resolved {ref or 'HEAD'} of {strip_credentials(url)} to {commit}")
+    return commit
+
+
+def _run_git(command, error):
+    try:
+        subprocess.run(
+            command,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"{error}: {e.stderr.strip()}")
+
+
+def clone_mirror(url, destination):
+    """
+    Clone a bare mirror of a remote repository, so pip can clone from the local disk instead.
+    :param url: The repository URL.
+    :param destination: The path of the mirror to create.
+    """
+    logger.debug(f"Cloning {strip_credentials(url)} into {destination}")
+    _run_git(
+        ["git", "clone", "--quiet", "--mirror", url, destination],
+        f"Error cloning {strip_credentials(url)}",
+    )
+
+
+def update_mirror(url, destination):
+    """
+    Bring a bare mirror of a remote repository up to date, cloning it if it does not exist yet.
+    Credentials in the URL are not stored in the mirror: the URL is only passed to git fetch.
+    :param url: The repository URL.
+    :param destination: The path of the mirror.
+    """
+    if not os.path.isdir(destination):
+        clone_mirror(url, destination)
+        _run_git(
+            ["git", "--git-dir", destination, "remote", "set-url", "origin", strip_credentials(url)],
+            f"Error configuring mirror of {strip_credentials(url)}",
+        )
+        return
+    logger.debug(f"Fetching {strip_credentials(url)} into {destination}")
+    _run_git(
+        [
+            "git",
+            "--git-dir",
+            destination,
+            "fetch",
+            "--quiet",
+            "--prune",
+            "--no-write-fetch-head",
+            url,
+            "+refs/*:refs/*",
+        ],
+        f"Error fetching {strip_credentials(url)}",
+    )
@@ -0,0 +1,286 @@
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from pip_install_privates.vcs import (
+    add_markers,
+    format_vcs_requirement,
+    iter_vcs_requirements,
+    markers_apply,
+    resolve_commit,
+    strip_credentials,
+    subdirectory,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def interpreter_tag():
+    """
+    Describe the running interpreter, its ABI and the platform, since built wheels are only valid for those.
+    :return: A string of the Python tag, ABI tag and platform tag, like cp311-cp311-linux_x86_64.
+    """
+    implementation = {"cpython": "cp", "pypy": "pp"}.get(
+        sys.implementation.name, sys.implementation.name
+    )
+    python = f"{implementation}{sys.version_info[0]}{sys.version_info[1]}"
+    if sys.implementation.name == "cpython":
+        abi = f"{python}{sys.abiflags}"
+    else:
+        abi = sysconfig.get_config_var("SOABI") or "none"
+    platform = sysconfig.get_platform()
+    return "-".join(tag.replace("-", "_").replace(".", "_") for tag in (python, abi, platform))
+
+
+class WheelCache(object):
+    """
+    A persistent cache of wheels built from private git requirements.
+    Wheels are keyed by repository, subdirectory, commit SHA, Python tag, ABI and platform, so a branch
+    or tag that moves to another commit automatically results in a cache miss, and the projects of a
+    monorepo get an entry each.
+    A shared remote cache (see remote_cache) can back the local one: wheels missing locally are
+    fetched from it, and newly stored wheels are uploaded to it.
+    """
+
+    def __init__(self, directory, remote=None):
+        self.directory = directory
+        self.remote = remote
+        self.hits = 0
+        self.misses = 0
+        self.remote_hits = 0
+        self.remote_misses = 0
+
+    @staticmethod
+    def _entry_key(url, commit, subdirectory=None):
+        project = strip_credentials(url)
+        if subdirectory:
+            project = f"{project}#subdirectory={subdirectory}"
+        repository = hashlib.sha256(project.encode("utf-8")).hexdigest()
+        return "/".join((repository[:16], commit, interpreter_tag()))
+
+    def _entry_directory(self, url, commit, subdirectory=None):
+        return os.path.join(self.directory, *self._entry_key(url, commit, subdirectory).split("/"))
+
+    def lookup(self, url, commit, subdirectory=None):
+        """
+        Find the cached wheel for a commit of a repository.
+        :param url: The repository URL.
+        :param commit: The commit SHA.
+        :param subdirectory: The directory of the project within the repository, if not the root.
+        :return: The path to the cached wheel, or None if there is none.
+        """
+        wheels = glob.glob(
+            os.path.join(self._entry_directory(url, commit, subdirectory), "*.whl")
+        )
+        wheel = wheels[0] if wheels else self._fetch_remote(url, commit, subdirectory)
+        if wheel:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return wheel
+
+    def _fetch_remote(self, url, commit, subdirectory=None):
+        if not self.remote:
+            return None
+        try:
+            with tempfile.TemporaryDirectory() as download_dir:
+                wheel = self.remote.fetch(
+                    self._entry_key(url, commit, subdirectory), download_dir
+                )
+                if not wheel:
+                    self.remote_misses += 1
+                    return None
+                logger.debug(f"Fetched {os.path.basename(wheel)} from the remote wheel cache")
+                self.remote_hits += 1
+                return self._store_locally(url, commit, wheel, subdirectory)
+        except Exception as e:
+            # The remote cache only saves time, an unreachable cache should not fail the installation
+            logger.warning(f"Could not fetch from the remote wheel cache: {e}")
+            self.remote_misses += 1
+            return None
+
+    def store(self, url, commit, wheel, subdirectory=None):
+        """
+        Add a wheel to the cache, and upload it to the remote cache.
+        :param url: The repository URL the wheel was built from.
+        :param commit: The commit SHA the wheel was built from.
+        :param wheel: The path to the built wheel.
+        :param subdirectory: The directory of the project within the repository, if not the root.
+        :return: The path to the cached wheel.
+        """
+        cached = self._store_locally(url, commit, wheel, subdirectory)
+        if self.remote:
+            try:
+                self.remote.upload(self._entry_key(url, commit, subdirectory), cached)
+                logger.debug(f"Uploaded {os.path.basename(wheel)} to the remote wheel cache")
+            except Exception as e:
+                logger.warning(f"Could not upload to the remote wheel cache: {e}")
+        return cached
+
+    def _store_locally(self, url, commit, wheel, subdirectory=None):
+        directory = self._entry_directory(url, commit, subdirectory)
+        os.makedirs(directory, exist_ok=True)
+        cached = os.path.join(directory, os.path.basename(wheel))
+        # Copy next to the final location first, so concurrent runs never see a partial wheel
+        partial = f"{cached}.partial.{os.getpid()}"
+        shutil.copyfile(wheel, partial)
+        os.replace(partial, cached)
+        logger.debug(f"Stored {os.path.basename(wheel)} in the wheel cache")
+        return cached
+
+
+def build_wheel(requirement, wheel_dir):
+    """
+    Build a wheel for a single requirement, without its dependencies.
+    :param requirement: The requirement to build a wheel for.
+    :param wheel_dir: The directory to put the built wheel in.
+    :return: The path to the built wheel.
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "pip",
+        "wheel",
+        "--no-deps",
+        "--wheel-dir",
+        wheel_dir,
+        requirement,
+    ]
+    if subprocess.call(command) != 0:
+        raise RuntimeError(f"Error building wheel for {strip_credentials(requirement)}")
+    wheels = glob.glob(os.path.join(wheel_dir, "*.whl"))
+    if len(wheels) != 1:
+        raise RuntimeError(f"Error building wheel for {strip_credentials(requirement)}")
+    return wheels[0]
+
+
+def build_wheel_into(requirement, wheelhouse):
+    """
+    Build a wheel for a single requirement and move it into a wheelhouse shared with other builds.
+    :param requirement: The requirement to build a wheel for.
+    :param wheelhouse: The directory to put the built wheel in.
+    :return: The path to the wheel in the wheelhouse.
+    """
+    with tempfile.TemporaryDirectory(dir=wheelhouse) as build_dir:
+        wheel = build_wheel(requirement, build_dir)
+        destination = os.path.join(wheelhouse, os.path.basename(wheel))
+        os.replace(wheel, destination)
+    return destination
+
+
+def build_wheels_concurrently(requirements, wheelhouse, jobs=None):
+    """
+    Build wheels for several requirements at the same time.
+    Every build runs in its own pip process, so the builds are spread over all cores.
+    :param requirements: The requirements to build wheels for.
+    :param wheelhouse: The directory to put the built wheels in.
+    :param jobs: The maximum number of concurrent builds, defaults to the number of CPUs.
+    :return: The paths to the built wheels, in the order of the requirements.
+    """
+    if not requirements:
+        return []
+    logger.debug(f"Building {len(requirements)} wheels with {jobs} workers")
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(
+            executor.map(
+                build_wheel_into, requirements, [wheelhouse] * len(requirements)
+            )
+        )
+
+
+def build_wheels(requirements, wheelhouse, jobs=None):
+    """
+    Build wheels for all git requirements in parallel, and let pip install those instead.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param wheelhouse: The directory to put the built wheels in.
+    :param jobs: The maximum number of concurrent builds, defaults to the number of CPUs.
+    :return: The requirements, with git requirements replaced by paths to the built wheels. Requirements
+        whose environment markers do not apply are left unchanged.
+    """
+    requirements = list(requirements)
+    # Requirements whose markers do not apply are skipped by pip, so they are not built either
+    vcs_requirements = [
+        (index, vcs_requirement)
+        for index, vcs_requirement in iter_vcs_requirements(requirements)
+        if markers_apply(vcs_requirement.markers)
+    ]
+    if not vcs_requirements:
+        return requirements
+    wheels = build_wheels_concurrently(
+        [format_vcs_requirement(v._replace(markers=None)) for _, v in vcs_requirements],
+        wheelhouse,
+        jobs,
+    )
+    for (index, vcs_requirement), wheel in zip(vcs_requirements, wheels):
+        requirements[index] = add_markers(wheel, vcs_requirement.markers)
+    # Private packages can depend on each other by name, let pip find those in the wheelhouse too
+    return ["--find-links", wheelhouse] + requirements
+
+
+def use_wheel_cache(requirements, cache, jobs=None, origins=None):
+    """
+    Replace git requirements with wheels from the cache, building and storing the missing ones.
+    :param requirements: The requirements as returned by collect_requirements.
+    :param cache: The WheelCache to use.
+    :param jobs: The maximum number of concurrent lookups and builds, defaults to the number of CPUs.
+    :param origins: An optional dict mapping URLs of local mirrors to the repository URLs they mirror, so
+        wheels are cached under the repository URL, as returned by prefetch.mirror_origins.
+    :return: The requirements, with git requirements replaced by paths to cached wheels. Requirements
+        whose environment markers do not apply are left unchanged.
+    """
+    origins = origins or {}
+    requirements = list(requirements)
+    # Requirements whose markers do not apply are skipped by pip, so they are not built either
+    vcs_requirements = [
+        (index, vcs_requirement)
+        for index, vcs_requirement in iter_vcs_requirements(requirements)
+        if markers_apply(vcs_requirement.markers)
+    ]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        commits = list(
+            executor.map(
+                resolve_commit,
+                [v.url for _, v in vcs_requirements],
+                [v.ref for _, v in vcs_requirements],
+            )
+        )
+
+    wheels = {}
+    misses = []
+    for (index, vcs_requirement), commit in zip(vcs_requirements, commits):
+        if not commit:
+            continue
+        wheels[index] = cache.lookup(
+            origins.get(vcs_requirement.url, vcs_requirement.url),
+            commit,
+            subdirectory(vcs_requirement),
+        )
+        if wheels[index]:
+            logger.debug(f"Using cached wheel {os.path.basename(wheels[index])}")
+        else:
+            misses.append((index, vcs_requirement, commit))
+
+    with tempfile.TemporaryDirectory() as wheelhouse:
+        built = build_wheels_concurrently(
+            [
+                format_vcs_requirement(v._replace(ref=commit, markers=None))
+                for _, v, commit in misses
+            ],
+            wheelhouse,
+            jobs,
+        )
+        for (index, vcs_requirement, commit), wheel in zip(misses, built):
+            url = origins.get(vcs_requirement.url, vcs_requirement.url)
+            wheels[index] = cache.store(url, commit, wheel, subdirectory(vcs_requirement))
+
+    for index, vcs_requirement in vcs_requirements:
+        if index in wheels:
+            requirements[index] = add_markers(wheels[index], vcs_requirement.markers)
+    return requirements
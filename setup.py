@@ -23,7 +23,10 @@ setup(
     install_requires=['pip'],
     entry_points={
         'console_scripts': [
-            'pip_install_privates = pip_install_privates.install:install'
+            'pip_install_privates = pip_install_privates.install:install',
+            'pip_install_privates_publish = pip_install_privates.install:publish',
+            'pip_install_privates_daemon = pip_install_privates.install:run_daemon',
+            'pip_install_privates_batch = pip_install_privates.install:batch',
         ]
     }
 )
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import tempfile
+
+GIT_ENVIRONMENT = dict(
+    os.environ,
+    GIT_AUTHOR_NAME="Test",
+    GIT_AUTHOR_EMAIL="test@example.com",
+    GIT_COMMITTER_NAME="Test",
+    GIT_COMMITTER_EMAIL="test@example.com",
+    GIT_CONFIG_NOSYSTEM="1",
+)
+
+
+def git(*args, cwd=None):
+    return subprocess.check_output(
+        ["git"] + list(args), cwd=cwd, env=GIT_ENVIRONMENT, universal_newlines=True
+    ).strip()
+
+
+def create_bare_repository(test_case, files=None):
+    """
+    Create a bare repository with a single commit on main, which is cleaned up after the test.
+    :return: A tuple of the path to the bare repository and the path to a work tree that pushes to it.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp.cleanup)
+    bare = os.path.join(tmp.name, "repo.git")
+    work = os.path.join(tmp.name, "work")
+    git("init", "--quiet", "--bare", "--initial-branch=main", bare)
+    git("clone", "--quiet", bare, work)
+    git("checkout", "--quiet", "-b", "main", cwd=work)
+    commit_files(work, files or {"README": "initial\n"})
+    return bare, work
+
+
+def commit_files(work, files, message="commit"):
+    """
+    Commit files in a work tree and push them to its origin.
+    :return: The SHA of the new commit.
+    """
+    for name, content in files.items():
+        path = os.path.join(work, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    git("add", "--all", cwd=work)
+    git("commit", "--quiet", "--allow-empty", "-m", message, cwd=work)
+    git("push", "--quiet", "--tags", "origin", "HEAD:main", cwd=work)
+    return git("rev-parse", "HEAD", cwd=work)
@@ -0,0 +1,101 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.batch import (
+    ParseCache,
+    expand_patterns,
+    output_paths,
+    transform_files,
+)
+from pip_install_privates.install import _transform_lines, collect_requirements
+
+
+class TestBatch(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self._write("base.txt", "requests==2.31.0\ngit+git@github.com:MyOrg/base.git#egg=base\n")
+        self._write(
+            "services/api/requirements.txt",
+            "-r ../../base.txt\n-e git+git@github.com:MyOrg/api.git#egg=api\n",
+        )
+        self._write("services/web/requirements.txt", "-r ../../base.txt\ndjango==4.2\n")
+
+    def _write(self, name, contents):
+        path = os.path.join(self.tmp, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(contents)
+        return path
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_parse_cache_collects_like_collect_requirements(self):
+        fname = self._path("services/api/requirements.txt")
+
+        self.assertEqual(
+            ParseCache(transform_with_token="my-token").collect(fname),
+            collect_requirements(fname, transform_with_token="my-token"),
+        )
+
+    def test_parse_cache_transforms_included_files_once(self):
+        cache = ParseCache()
+
+        with patch(
+            "pip_install_privates.install._transform_lines", wraps=_transform_lines
+        ) as mock_transform:
+            cache.collect(self._path("services/api/requirements.txt"))
+            cache.collect(self._path("services/web/requirements.txt"))
+
+        self.assertEqual(mock_transform.call_count, 3)
+
+    def test_expands_glob_patterns(self):
+        self.assertEqual(
+            expand_patterns([os.path.join(self.tmp, "**/requirements.txt")]),
+            [
+                self._path("services/api/requirements.txt"),
+                self._path("services/web/requirements.txt"),
+            ],
+        )
+
+    def test_keeps_directory_structure_in_output_dir(self):
+        self.assertEqual(
+            output_paths(
+                [self._path("services/api/requirements.txt"), self._path("base.txt")], "/out"
+            ),
+            ["/out/services/api/requirements.txt", "/out/base.txt"],
+        )
+
+    def test_writes_transformed_requirements_files(self):
+        output_dir = self._path("out")
+        fnames = expand_patterns([os.path.join(self.tmp, "services/*/requirements.txt")])
+
+        outputs = transform_files(fnames, output_dir, jobs=2)
+
+        self.assertEqual(
+            outputs,
+            [
+                os.path.join(output_dir, "api/requirements.txt"),
+                os.path.join(output_dir, "web/requirements.txt"),
+            ],
+        )
+        with open(outputs[0]) as f:
+            self.assertEqual(
+                f.read(),
+                "requests==2.31.0\n"
+                "git+https://github.com/MyOrg/base.git#egg=base\n"
+                "-e git+https://github.com/MyOrg/api.git#egg=api\n",
+            )
+
+    def test_raises_error_after_transforming_other_files(self):
+        fnames = [self._path("missing.txt"), self._path("services/web/requirements.txt")]
+
+        with self.assertRaisesRegex(RuntimeError, "Could not transform 1 of 2"):
+            transform_files(fnames, self._path("out"), jobs=1)
+
+        self.assertTrue(os.path.exists(self._path("out/services/web/requirements.txt")))
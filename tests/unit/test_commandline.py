@@ -7,10 +7,13 @@ except ImportError:
 
 from unittest import TestCase
 
+import json
+import os
 import sys
-from mock import patch
+import tempfile
+from mock import ANY, patch
 
-from pip_install_privates.install import install, status_codes
+from pip_install_privates.install import batch, install, publish, status_codes
 
 
 class TestCommandLine(TestCase):
@@ -36,8 +39,33 @@ class TestCommandLine(TestCase):
             ci_job_token=None,
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
+    def test_commandline_passes_jobs_to_collect(self):
+        with patch.object(sys, "argv", ["pip-install", "-j", "3", "requirements.txt"]):
+            install()
+
+        self.assertEqual(self.mock_collect.call_args.kwargs["jobs"], 3)
+
+    def test_commandline_installs_several_requirements_files_with_one_pip_run(self):
+        self.mock_collect.return_value = ["mock==2.0.0", "fso==0.3.1"]
+
+        with patch.object(sys, "argv", ["pip-install", "base.txt", "prod.txt"]):
+            install()
+
+        self.mock_collect.assert_called_once_with(
+            "base.txt",
+            "prod.txt",
+            transform_with_token=None,
+            gitlab_domain=None,
+            ci_job_token=None,
+            github_root_dir=None,
+            project_names=None,
+            jobs=ANY,
+        )
+        self.mock_pip.assert_called_once_with(["install", "mock==2.0.0", "fso==0.3.1"])
+
     def test_commandline_passes_specified_token_to_collect(self):
         with patch.object(
             sys, "argv", ["pip-install", "-t", "my-token", "requirements.txt"]
@@ -51,6 +79,7 @@ class TestCommandLine(TestCase):
             ci_job_token=None,
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
     def test_uses_github_token_environment_variable_if_no_token_supplied(self):
@@ -67,6 +96,7 @@ class TestCommandLine(TestCase):
             ci_job_token=None,
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
     def test_uses_none_if_no_token_supplied_and_no_github_token_defined_as_environment_variable(
@@ -82,6 +112,7 @@ class TestCommandLine(TestCase):
             ci_job_token=None,
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
     def test_commandline_requires_requirements_file(self):
@@ -122,6 +153,7 @@ class TestCommandLine(TestCase):
             ci_job_token="CI-token",
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
     def test_uses_gitlab_domain_environment_variable_if_defined(self):
@@ -139,6 +171,7 @@ class TestCommandLine(TestCase):
             ci_job_token="CI-token",
             github_root_dir=None,
             project_names=None,
+            jobs=ANY,
         )
 
     def test_commandline_with_all_arguments(self):
@@ -176,4 +209,503 @@ class TestCommandLine(TestCase):
             ci_job_token="arg_ci_job_token",
             github_root_dir="arg_github_root_dir",
             project_names="arg_project1,arg_project2",
+            jobs=ANY,
+        )
+
+    def test_askpass_keeps_tokens_out_of_collected_requirements(self):
+        with patch.object(
+            sys,
+            "argv",
+            [
+                "pip-install",
+                "--askpass",
+                "-t",
+                "my-token",
+                "--gitlab-token",
+                "CI-token",
+                "requirements.txt",
+            ],
+        ):
+            install()
+
+        self.mock_collect.assert_called_once_with(
+            "requirements.txt",
+            transform_with_token=None,
+            gitlab_domain=None,
+            ci_job_token=None,
+            github_root_dir=None,
+            project_names=None,
+            jobs=ANY,
+        )
+
+    def test_askpass_rewrites_gitlab_com_ssh_urls_to_https(self):
+        self.mock_collect.return_value = ["git+git@gitlab.com:MyOrg/repo.git@v1 ; python_version>\"3\""]
+
+        with patch.object(
+            sys,
+            "argv",
+            ["pip-install", "--askpass", "--gitlab-token", "CI-token", "requirements.txt"],
+        ):
+            install()
+
+        self.mock_pip.assert_called_once_with(
+            ["install", "git+https://gitlab.com/MyOrg/repo.git@v1 ; python_version>\"3\""]
+        )
+
+    def test_askpass_runs_pip_with_askpass_helper(self):
+        self.mock_collect.return_value = ["req1"]
+
+        with patch("pip_install_privates.install.git_askpass") as mock_askpass:
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--askpass", "-t", "my-token", "requirements.txt"],
+            ):
+                install()
+
+        mock_askpass.assert_called_once_with(
+            github_token="my-token", gitlab_token=None, gitlab_domain=None
+        )
+        mock_askpass.return_value.__enter__.assert_called_once()
+        self.mock_pip.assert_called_once_with(["install", "req1"])
+
+    def test_archives_installs_archives_with_tokens_in_netrc(self):
+        self.mock_collect.return_value = [
+            "git+https://github.com/MyOrg/repo.git@v1.0#egg=repo"
+        ]
+
+        with patch.object(
+            sys,
+            "argv",
+            ["pip-install", "--archives", "-t", "my-token", "requirements.txt"],
+        ):
+            with patch(
+                "pip_install_privates.install.archive_credentials"
+            ) as mock_credentials:
+                install()
+
+        self.assertIsNone(self.mock_collect.call_args[1]["transform_with_token"])
+        mock_credentials.assert_called_once_with(
+            github_token="my-token", gitlab_domain=None, gitlab_token=None
+        )
+        self.mock_pip.assert_called_once_with(
+            [
+                "install",
+                "https://api.github.com/repos/MyOrg/repo/tarball/v1.0#egg=repo",
+            ]
+        )
+
+    def test_skip_satisfied_installs_only_missing_requirements(self):
+        self.mock_collect.return_value = ["mock==2.0.0", "requests==2.0"]
+
+        with patch("pip_install_privates.install.drop_satisfied") as mock_drop, patch(
+            "pip_install_privates.install.load_manifest"
+        ) as mock_load, patch(
+            "pip_install_privates.install.save_manifest"
+        ) as mock_save, patch(
+            "pip_install_privates.install.manifest_entries"
+        ) as mock_entries:
+            mock_drop.return_value = ["requests==2.0"]
+            mock_load.return_value = {
+                "six": {"requirement": "six==1.0", "version": "1.0", "commit": None}
+            }
+            mock_entries.return_value = {
+                "requests": {"requirement": "requests==2.0", "version": "2.0", "commit": None}
+            }
+            with patch.object(
+                sys, "argv", ["pip-install", "--skip-satisfied", "requirements.txt"]
+            ):
+                install()
+
+        mock_drop.assert_called_once_with(
+            ["mock==2.0.0", "requests==2.0"], ANY, mock_load.return_value
+        )
+        self.mock_pip.assert_called_once_with(["install", "requests==2.0"])
+        mock_save.assert_called_once_with(
+            ANY, dict(mock_load.return_value, **mock_entries.return_value)
+        )
+
+    def test_skip_satisfied_does_not_run_pip_if_all_requirements_are_installed(self):
+        self.mock_collect.return_value = ["--find-links", "/wheels", "mock==2.0.0"]
+
+        with patch("pip_install_privates.install.drop_satisfied") as mock_drop, patch(
+            "pip_install_privates.install.load_manifest"
+        ), patch("pip_install_privates.install.save_manifest"):
+            mock_drop.return_value = ["--find-links", "/wheels"]
+            with patch.object(
+                sys, "argv", ["pip-install", "--skip-satisfied", "requirements.txt"]
+            ):
+                install()
+
+        self.assertFalse(self.mock_pip.called)
+
+    def test_skip_satisfied_continues_if_manifest_can_not_be_written(self):
+        self.mock_collect.return_value = ["mock==2.0.0"]
+
+        with patch("pip_install_privates.install.drop_satisfied") as mock_drop, patch(
+            "pip_install_privates.install.load_manifest"
+        ), patch("pip_install_privates.install.manifest_entries"), patch(
+            "pip_install_privates.install.save_manifest"
+        ) as mock_save:
+            mock_drop.return_value = []
+            mock_save.side_effect = PermissionError("Permission denied")
+            with patch.object(
+                sys, "argv", ["pip-install", "--skip-satisfied", "requirements.txt"]
+            ):
+                install()
+
+        mock_save.assert_called_once()
+        self.assertFalse(self.mock_pip.called)
+
+    def test_sync_installs_changes_and_uninstalls_removed_requirements(self):
+        self.mock_collect.return_value = ["mock==2.0.0", "requests==2.0"]
+
+        with patch("pip_install_privates.install.plan_sync") as mock_plan, patch(
+            "pip_install_privates.install.load_manifest"
+        ) as mock_load, patch(
+            "pip_install_privates.install.save_manifest"
+        ) as mock_save, patch(
+            "pip_install_privates.install.manifest_entries"
+        ) as mock_entries:
+            mock_plan.return_value = (["requests==2.0"], ["six"])
+            with patch.object(sys, "argv", ["pip-install", "--sync", "requirements.txt"]):
+                install()
+
+        mock_plan.assert_called_once_with(
+            ["mock==2.0.0", "requests==2.0"], mock_load.return_value, ANY
+        )
+        self.assertEqual(
+            self.mock_pip.call_args_list,
+            [
+                ((["install", "requests==2.0"],),),
+                ((["uninstall", "--yes", "six"],),),
+            ],
+        )
+        mock_entries.assert_called_once_with(["mock==2.0.0", "requests==2.0"])
+        mock_save.assert_called_once_with(ANY, mock_entries.return_value)
+
+    def test_sync_records_commits_installed_from_wheel_cache(self):
+        commit = "0123456789abcdef0123456789abcdef01234567"
+        pinned = [f"git+https://github.com/MyOrg/repo.git@{commit}#egg=repo"]
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git@main#egg=repo"]
+
+        with patch("pip_install_privates.install.pin_refs") as mock_pin, patch(
+            "pip_install_privates.install.use_wheel_cache"
+        ) as mock_cache, patch("pip_install_privates.install.plan_sync") as mock_plan, patch(
+            "pip_install_privates.install.load_manifest"
+        ), patch(
+            "pip_install_privates.install.save_manifest"
+        ), patch(
+            "pip_install_privates.install.manifest_entries"
+        ) as mock_entries:
+            mock_pin.return_value = pinned
+            mock_plan.side_effect = lambda requirements, manifest, jobs: (requirements, [])
+            mock_cache.return_value = ["/cache/wheels/repo-1.0-py3-none-any.whl"]
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--sync", "--cache-dir", "/cache", "requirements.txt"],
+            ):
+                install()
+
+        mock_cache.assert_called_once_with(pinned, ANY, ANY, origins=None)
+        mock_entries.assert_called_once_with(pinned)
+
+    def test_sync_does_not_save_manifest_if_installing_fails(self):
+        self.mock_collect.return_value = ["requests==2.0"]
+        self.mock_pip.return_value = status_codes.ERROR
+
+        with patch("pip_install_privates.install.plan_sync") as mock_plan, patch(
+            "pip_install_privates.install.load_manifest"
+        ), patch("pip_install_privates.install.save_manifest") as mock_save:
+            mock_plan.return_value = (["requests==2.0"], [])
+            with patch.object(sys, "argv", ["pip-install", "--sync", "requirements.txt"]):
+                with self.assertRaises(RuntimeError):
+                    install()
+
+        self.assertFalse(mock_save.called)
+
+    def test_pin_refs_pins_requirements_with_ref_cache_in_cache_dir(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git@main"]
+
+        with patch("pip_install_privates.install.pin_refs") as mock_pin, patch(
+            "pip_install_privates.install.use_wheel_cache"
+        ) as mock_cache:
+            mock_pin.return_value = ["git+https://github.com/MyOrg/repo.git@0123abc"]
+            mock_cache.side_effect = lambda requirements, cache, jobs, origins: requirements
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "pip-install",
+                    "--pin-refs",
+                    "--ref-ttl",
+                    "60",
+                    "--cache-dir",
+                    "/cache",
+                    "requirements.txt",
+                ],
+            ):
+                install()
+
+        ref_cache = mock_pin.call_args[0][1]
+        self.assertEqual(ref_cache.path, os.path.join("/cache", "refs.json"))
+        self.assertEqual(ref_cache.ttl, 60)
+        self.mock_pip.assert_called_once_with(
+            ["install", "git+https://github.com/MyOrg/repo.git@0123abc"]
+        )
+
+    def test_uses_wheel_cache_if_cache_dir_supplied(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.use_wheel_cache") as mock_cache:
+            mock_cache.return_value = ["/cache/wheels/repo-1.0-py3-none-any.whl"]
+            with patch.object(
+                sys, "argv", ["pip-install", "--cache-dir", "/cache", "requirements.txt"]
+            ):
+                install()
+
+        self.assertEqual(
+            mock_cache.call_args[0][1].directory, os.path.join("/cache", "wheels")
+        )
+        self.mock_pip.assert_called_once_with(
+            ["install", "/cache/wheels/repo-1.0-py3-none-any.whl"]
+        )
+
+    def test_uses_remote_cache_without_cache_dir(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.use_wheel_cache") as mock_cache:
+            mock_cache.return_value = ["/tmp/wheels/repo-1.0-py3-none-any.whl"]
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--remote-cache", "https://cache.example.com/wheels", "requirements.txt"],
+            ):
+                install()
+
+        self.assertEqual(
+            mock_cache.call_args[0][1].remote.url, "https://cache.example.com/wheels"
+        )
+        self.mock_pip.assert_called_once_with(
+            ["install", "/tmp/wheels/repo-1.0-py3-none-any.whl"]
+        )
+
+    def test_installs_requirements_file_named_like_a_subcommand(self):
+        self.mock_collect.return_value = ["mock==2.0.0"]
+
+        with patch.object(sys, "argv", ["pip-install", "publish"]):
+            install()
+
+        self.assertEqual(self.mock_collect.call_args[0], ("publish",))
+        self.mock_pip.assert_called_once_with(["install", "mock==2.0.0"])
+
+    def test_publish_publishes_requirements_to_index_dir(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.publish_requirements") as mock_publish:
+            publish(["-j", "2", "requirements.txt", "/index"])
+
+        mock_publish.assert_called_once_with(
+            ["git+https://github.com/MyOrg/repo.git"], "/index", 2, None
+        )
+        self.assertFalse(self.mock_pip.called)
+
+    def test_batch_transforms_matching_files_without_tokens(self):
+        with patch("pip_install_privates.batch.transform_files") as mock_transform:
+            with patch(
+                "pip_install_privates.batch.expand_patterns",
+                return_value=["a/requirements.txt", "b/requirements.txt"],
+            ) as mock_expand:
+                batch(["-j", "4", "-o", "/out", "*/requirements.txt"])
+
+        mock_expand.assert_called_once_with(["*/requirements.txt"])
+        mock_transform.assert_called_once_with(
+            ["a/requirements.txt", "b/requirements.txt"],
+            "/out",
+            4,
+            gitlab_domain=None,
+            github_root_dir=None,
+            project_names=None,
+        )
+        self.assertFalse(self.mock_pip.called)
+
+    def test_only_installs_public_requirements(self):
+        self.mock_collect.return_value = [
+            "requests==2.31.0",
+            "git+https://github.com/MyOrg/repo.git",
+        ]
+
+        with patch.object(sys, "argv", ["pip-install", "--only", "public", "requirements.txt"]):
+            install()
+
+        self.mock_pip.assert_called_once_with(["install", "requests==2.31.0"])
+
+    def test_only_skips_pip_without_requirements_in_partition(self):
+        self.mock_collect.return_value = ["requests==2.31.0"]
+
+        with patch.object(sys, "argv", ["pip-install", "--only", "private", "requirements.txt"]):
+            install()
+
+        self.assertFalse(self.mock_pip.called)
+
+    def test_split_to_writes_files_without_tokens_or_installing(self):
+        self.mock_collect.return_value = [
+            "requests==2.31.0",
+            "git+https://github.com/MyOrg/repo.git",
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--token", "my-token", "--split-to", tmp, "requirements.txt"],
+            ):
+                install()
+
+            with open(os.path.join(tmp, "public.txt")) as f:
+                self.assertEqual(f.read(), "requests==2.31.0\n")
+            with open(os.path.join(tmp, "private.txt")) as f:
+                self.assertEqual(f.read(), "git+https://github.com/MyOrg/repo.git\n")
+        self.assertIsNone(self.mock_collect.call_args[1]["transform_with_token"])
+        self.assertFalse(self.mock_pip.called)
+
+    def test_profile_writes_report_of_phases(self):
+        self.mock_collect.return_value = ["requests==2.31.0"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--profile", os.path.join(tmp, "report.json"), "requirements.txt"],
+            ):
+                install()
+
+            with open(os.path.join(tmp, "report.json")) as f:
+                report = json.load(f)
+        self.assertEqual(sorted(report["phases"]), ["collect", "pip_install"])
+
+    def test_metrics_records_failed_runs(self):
+        self.mock_collect.return_value = ["requests==2.31.0"]
+        self.mock_pip.return_value = status_codes.ERROR
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.jsonl")
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--metrics", path, "--metrics-format", "jsonl", "requirements.txt"],
+            ):
+                with self.assertRaises(RuntimeError):
+                    install()
+
+            with open(path) as f:
+                metrics = json.load(f)["metrics"]
+        self.assertIn({"name": "success", "labels": {}, "value": 0}, metrics)
+        self.assertIn({"name": "requirements", "labels": {"kind": "public"}, "value": 1}, metrics)
+
+    def test_daemon_collects_and_pins_requirements(self):
+        with patch("pip_install_privates.daemon.collect_with_daemon") as mock_daemon, patch(
+            "pip_install_privates.install.pin_refs"
+        ) as mock_pin:
+            mock_daemon.return_value = ["git+https://github.com/MyOrg/repo.git@0123abc"]
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--daemon", "/run/daemon.sock", "--pin-refs", "requirements.txt"],
+            ):
+                install()
+
+        self.assertFalse(self.mock_collect.called)
+        self.assertFalse(mock_pin.called)
+        self.assertEqual(mock_daemon.call_args[0][:2], ("/run/daemon.sock", ["requirements.txt"]))
+        self.assertTrue(mock_daemon.call_args[1]["pin"])
+        self.mock_pip.assert_called_once_with(
+            ["install", "git+https://github.com/MyOrg/repo.git@0123abc"]
+        )
+
+    def test_daemon_install_lets_daemon_run_pip(self):
+        with patch("pip_install_privates.daemon.collect_with_daemon") as mock_daemon, patch(
+            "pip_install_privates.daemon.install_with_daemon"
+        ) as mock_install:
+            mock_daemon.return_value = ["requests==2.31.0"]
+            mock_install.return_value = status_codes.SUCCESS
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--daemon", "/run/daemon.sock", "--daemon-install", "requirements.txt"],
+            ):
+                install()
+
+        mock_install.assert_called_once_with("/run/daemon.sock", ["requests==2.31.0"], None)
+        self.assertFalse(self.mock_pip.called)
+
+    def test_daemon_install_requires_daemon(self):
+        with patch.object(sys, "argv", ["pip-install", "--daemon-install", "requirements.txt"]):
+            with patch("sys.stderr", new_callable=StringIO):
+                with self.assertRaises(SystemExit):
+                    install()
+
+    def test_prefetches_requirements_with_given_number_of_jobs(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.prefetch_requirements") as mock_prefetch:
+            mock_prefetch.return_value = ["git+file:///staging/repo.git"]
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--prefetch", "--jobs", "3", "requirements.txt"],
+            ):
+                install()
+
+        mock_prefetch.assert_called_once_with(
+            ["git+https://github.com/MyOrg/repo.git"], ANY, 3
+        )
+        self.mock_pip.assert_called_once_with(
+            ["install", "git+file:///staging/repo.git"]
+        )
+
+    def test_mirror_points_requirements_to_mirrors_in_cache_dir(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.mirror_requirements") as mock_mirror, patch(
+            "pip_install_privates.install.use_wheel_cache"
+        ) as mock_cache:
+            mock_mirror.return_value = ["git+file:///cache/mirrors/repo.git"]
+            mock_cache.side_effect = lambda requirements, cache, jobs, origins: requirements
+            with patch.object(
+                sys,
+                "argv",
+                ["pip-install", "--mirror", "--cache-dir", "/cache", "requirements.txt"],
+            ):
+                install()
+
+        mock_mirror.assert_called_once_with(
+            ["git+https://github.com/MyOrg/repo.git"], os.path.join("/cache", "mirrors"), ANY
+        )
+        self.mock_pip.assert_called_once_with(
+            ["install", "git+file:///cache/mirrors/repo.git"]
+        )
+
+    def test_mirror_requires_cache_dir(self):
+        with patch.object(sys, "argv", ["pip-install", "--mirror", "requirements.txt"]):
+            with patch("sys.stderr", new_callable=StringIO):
+                with self.assertRaises(SystemExit):
+                    install()
+
+    def test_builds_wheels_if_requested(self):
+        self.mock_collect.return_value = ["git+https://github.com/MyOrg/repo.git"]
+
+        with patch("pip_install_privates.install.build_wheels") as mock_build:
+            mock_build.return_value = ["/wheelhouse/repo-1.0-py3-none-any.whl"]
+            with patch.object(
+                sys, "argv", ["pip-install", "--build-wheels", "-j", "8", "requirements.txt"]
+            ):
+                install()
+
+        mock_build.assert_called_once_with(
+            ["git+https://github.com/MyOrg/repo.git"], ANY, 8
+        )
+        self.mock_pip.assert_called_once_with(
+            ["install", "/wheelhouse/repo-1.0-py3-none-any.whl"]
         )
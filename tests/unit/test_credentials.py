@@ -0,0 +1,104 @@
+import os
+import subprocess
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.credentials import (
+    GITHUB_TOKEN_VARIABLE,
+    GITLAB_TOKEN_VARIABLE,
+    git_askpass,
+    netrc_credentials,
+)
+
+
+class TestGitAskpass(TestCase):
+
+    def _ask(self, script, prompt):
+        return subprocess.check_output([script, prompt]).decode().strip()
+
+    def test_sets_askpass_environment_for_git(self):
+        with patch.dict("os.environ", {}, clear=True):
+            with git_askpass(github_token="gh-token", gitlab_token="gl-token") as script:
+                self.assertEqual(os.environ["GIT_ASKPASS"], script)
+                self.assertEqual(os.environ["GIT_TERMINAL_PROMPT"], "0")
+                self.assertEqual(os.environ[GITHUB_TOKEN_VARIABLE], "gh-token")
+                self.assertEqual(os.environ[GITLAB_TOKEN_VARIABLE], "gl-token")
+
+    def test_restores_environment_afterwards(self):
+        with patch.dict("os.environ", {"GIT_ASKPASS": "/usr/bin/other"}, clear=True):
+            with git_askpass(github_token="gh-token"):
+                pass
+
+            self.assertEqual(os.environ, {"GIT_ASKPASS": "/usr/bin/other"})
+
+    def test_removes_helper_script_afterwards(self):
+        with git_askpass(github_token="gh-token") as script:
+            self.assertTrue(os.path.exists(script))
+
+        self.assertFalse(os.path.exists(script))
+
+    def test_helper_answers_github_prompts_with_token(self):
+        with git_askpass(github_token="gh-token", gitlab_token="gl-token") as script:
+            username = self._ask(script, "Username for 'https://github.com': ")
+            password = self._ask(script, "Password for 'https://gh-token@github.com': ")
+
+        self.assertEqual(username, "gh-token")
+        self.assertEqual(password, "x-oauth-basic")
+
+    def test_helper_answers_gitlab_prompts_with_ci_job_token(self):
+        with git_askpass(
+            github_token="gh-token", gitlab_token="gl-token", gitlab_domain="my.gitlab.com"
+        ) as script:
+            username = self._ask(script, "Username for 'https://my.gitlab.com': ")
+            password = self._ask(
+                script, "Password for 'https://gitlab-ci-token@my.gitlab.com': "
+            )
+
+        self.assertEqual(username, "gitlab-ci-token")
+        self.assertEqual(password, "gl-token")
+
+    def test_helper_answers_gitlab_com_prompts_without_custom_domain(self):
+        with git_askpass(gitlab_token="gl-token") as script:
+            username = self._ask(script, "Username for 'https://gitlab.com': ")
+            password = self._ask(script, "Password for 'https://gitlab-ci-token@gitlab.com': ")
+
+        self.assertEqual(username, "gitlab-ci-token")
+        self.assertEqual(password, "gl-token")
+
+    def test_helper_does_not_answer_prompts_of_other_hosts(self):
+        with git_askpass(
+            gitlab_token="gl-token", gitlab_domain="my.gitlab.com:8443/gitlab"
+        ) as script:
+            username = self._ask(script, "Username for 'https://my.gitlab.com:8443': ")
+            self.assertEqual(username, "gitlab-ci-token")
+            for host in ("gitlab.com", "evil.example.com", "notmy.gitlab.com:8443"):
+                self.assertEqual(self._ask(script, f"Username for 'https://{host}': "), "")
+                self.assertEqual(
+                    self._ask(script, f"Password for 'https://gitlab-ci-token@{host}': "), ""
+                )
+
+
+class TestNetrcCredentials(TestCase):
+
+    def test_writes_machines_to_netrc_file(self):
+        with patch.dict("os.environ", {"HOME": "/nonexistent"}, clear=True):
+            with netrc_credentials({"gitlab.com": ("gitlab-ci-token", "gl-token")}) as netrc_file:
+                self.assertEqual(os.environ["NETRC"], netrc_file)
+                with open(netrc_file) as f:
+                    contents = f.read()
+
+        self.assertEqual(contents, "machine gitlab.com login gitlab-ci-token password gl-token\n")
+
+    def test_keeps_entries_of_existing_netrc_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".netrc") as existing:
+            existing.write("machine example.com login me password secret\n")
+            existing.flush()
+            with patch.dict("os.environ", {"NETRC": existing.name}, clear=True):
+                with netrc_credentials({"gitlab.com": ("gitlab-ci-token", "gl-token")}) as netrc_file:
+                    with open(netrc_file) as f:
+                        contents = f.read()
+
+                self.assertEqual(os.environ, {"NETRC": existing.name})
+
+        self.assertIn("machine example.com login me password secret", contents)
@@ -209,6 +209,19 @@ class TestGitLabURLConversion(unittest.TestCase):
             )
             self.assertEqual(result, expected)
 
+    def test_convert_to_gitlab_with_project_env_variable_without_token(self):
+        requirement = "git+ssh://git@github.com/ByteInternet/my-project2.git@my-tag#egg=my_project"
+        expected = "git+https://group.company/root/my-project2.git@my-tag#egg=my_project"
+
+        result = transform_github_to_gitlab(
+            line=requirement,
+            ci_job_token=None,
+            gitlab_domain="group.company/root",
+            github_root_dir="ByteInternet",
+            project_names=["my-project2"],
+        )
+        self.assertEqual(result, expected)
+
     def test_editable_gitlab_url_with_token_and_project_env_variable(self):
         fname = "requirements.txt"
         gitlab_token = "token"
@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.includes import (
+    IncludeCycleError,
+    file_key,
+    read_include_tree,
+)
+from pip_install_privates.install import collect_requirements
+
+
+class TestIncludes(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def _create_reqs_file(self, name, reqs):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as f:
+            f.write("\n".join(reqs))
+        return path
+
+    def test_includes_shared_file_only_once(self):
+        self._create_reqs_file("base.txt", ["mock==2.0.0"])
+        self._create_reqs_file("web.txt", ["-r base.txt", "Django==1.10"])
+        self._create_reqs_file("worker.txt", ["-r base.txt", "amqp==1.4.7"])
+        fname = self._create_reqs_file("all.txt", ["-r web.txt", "-r worker.txt"])
+
+        ret = collect_requirements(fname)
+
+        self.assertEqual(ret, ["mock==2.0.0", "Django==1.10", "amqp==1.4.7"])
+
+    def test_reads_shared_file_only_once(self):
+        self._create_reqs_file("base.txt", ["mock==2.0.0"])
+        self._create_reqs_file("web.txt", ["-r base.txt"])
+        fname = self._create_reqs_file("all.txt", ["-r web.txt", "-r base.txt"])
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            collect_requirements(fname)
+
+        self.assertEqual(
+            [call[0][0] for call in mock_open.call_args_list].count(
+                os.path.join(self.tmp, "base.txt")
+            ),
+            1,
+        )
+
+    def test_raises_error_for_file_including_itself(self):
+        fname = self._create_reqs_file("self.txt", ["mock==2.0.0", "-r self.txt"])
+
+        with self.assertRaises(IncludeCycleError) as e:
+            collect_requirements(fname)
+
+        self.assertEqual(e.exception.chain, [file_key(fname), file_key(fname)])
+
+    def test_raises_error_for_files_including_each_other(self):
+        self._create_reqs_file("a.txt", ["-r b.txt"])
+        self._create_reqs_file("b.txt", ["-r c.txt"])
+        self._create_reqs_file("c.txt", ["-r a.txt"])
+
+        with self.assertRaises(IncludeCycleError) as e:
+            collect_requirements(os.path.join(self.tmp, "a.txt"))
+
+        self.assertEqual(
+            [os.path.basename(path) for path in e.exception.chain],
+            ["a.txt", "b.txt", "c.txt", "a.txt"],
+        )
+
+    def test_read_include_tree_reads_every_file_once(self):
+        self._create_reqs_file("base.txt", ["mock==2.0.0"])
+        self._create_reqs_file("web.txt", ["-r base.txt", "Django==1.10"])
+        fname = self._create_reqs_file("all.txt", ["-r web.txt", "-r base.txt"])
+
+        ret = read_include_tree(fname, jobs=4)
+
+        self.assertEqual(
+            ret,
+            {
+                file_key(fname): ["-r web.txt\n", "-r base.txt"],
+                file_key(os.path.join(self.tmp, "web.txt")): [
+                    "-r base.txt\n",
+                    "Django==1.10",
+                ],
+                file_key(os.path.join(self.tmp, "base.txt")): ["mock==2.0.0"],
+            },
+        )
+
+    def test_read_include_tree_stops_at_cycles(self):
+        self._create_reqs_file("a.txt", ["-r b.txt"])
+        self._create_reqs_file("b.txt", ["-r a.txt"])
+
+        ret = read_include_tree(os.path.join(self.tmp, "a.txt"), jobs=2)
+
+        self.assertEqual(len(ret), 2)
+
+    def test_collects_same_requirements_when_reading_concurrently(self):
+        self._create_reqs_file("base.txt", ["mock==2.0.0", "git+git@github.com:MyOrg/a"])
+        self._create_reqs_file("web.txt", ["-r base.txt", "Django==1.10"])
+        self._create_reqs_file("worker.txt", ["-r base.txt", "amqp==1.4.7"])
+        fname = self._create_reqs_file("all.txt", ["-r web.txt", "-r worker.txt"])
+
+        self.assertEqual(
+            collect_requirements(fname, transform_with_token="my-token", jobs=4),
+            collect_requirements(fname, transform_with_token="my-token"),
+        )
+
+    def test_raises_error_for_cycle_when_reading_concurrently(self):
+        self._create_reqs_file("a.txt", ["-r b.txt"])
+        self._create_reqs_file("b.txt", ["-r a.txt"])
+
+        with self.assertRaises(IncludeCycleError):
+            collect_requirements(os.path.join(self.tmp, "a.txt"), jobs=2)
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestLazyImport(TestCase):
+
+    def _run(self, code):
+        return subprocess.check_output(
+            [sys.executable, "-c", code], universal_newlines=True
+        ).strip()
+
+    def test_importing_install_does_not_import_pip_internals(self):
+        ret = self._run(
+            "import sys, pip_install_privates.install; "
+            "print(any(name.startswith('pip._internal') for name in sys.modules))"
+        )
+
+        self.assertEqual(ret, "False")
+
+    def _imports(self, module):
+        return self._run(
+            f"import sys, pip_install_privates.install; print({module!r} in sys.modules)"
+        )
+
+    def test_importing_install_does_not_import_importlib_metadata(self):
+        self.assertEqual(self._imports("importlib.metadata"), "False")
+
+    def test_importing_install_does_not_import_asyncio(self):
+        self.assertEqual(self._imports("asyncio"), "False")
+
+    def test_importing_install_does_not_import_the_daemon(self):
+        self.assertEqual(self._imports("socketserver"), "False")
+
+    def test_importing_install_does_not_import_process_pools(self):
+        self.assertEqual(self._imports("concurrent.futures.process"), "False")
+
+    def test_importing_install_does_not_import_urllib_request(self):
+        self.assertEqual(self._imports("urllib.request"), "False")
+
+    def test_importing_install_does_not_configure_logging(self):
+        ret = self._run(
+            "import logging, pip_install_privates.install; "
+            "print(logging.getLogger().handlers)"
+        )
+
+        self.assertEqual(ret, "[]")
+
+    def test_status_codes_are_loaded_on_access(self):
+        ret = self._run(
+            "from pip_install_privates.install import status_codes; "
+            "print(status_codes.SUCCESS)"
+        )
+
+        self.assertEqual(ret, "0")
+
+    def test_prefetch_can_be_imported_without_fcntl(self):
+        ret = self._run(
+            "import sys; sys.modules['fcntl'] = None; "
+            "import pip_install_privates.prefetch; print('imported')"
+        )
+
+        self.assertEqual(ret, "imported")
+
+    def test_metrics_can_be_imported_without_resource(self):
+        ret = self._run(
+            "import sys; sys.modules['resource'] = None; "
+            "import pip_install_privates.metrics; print('imported')"
+        )
+
+        self.assertEqual(ret, "imported")
+
+    def test_daemon_can_be_imported_without_unix_sockets(self):
+        ret = self._run(
+            "import socket, socketserver; del socket.AF_UNIX; "
+            "del socketserver.UnixStreamServer, socketserver.ThreadingUnixStreamServer; "
+            "import pip_install_privates.daemon; print('imported')"
+        )
+
+        self.assertEqual(ret, "imported")
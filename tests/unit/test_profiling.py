@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.profiling import Profiler
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        pip_logger = logging.getLogger("pip._internal")
+        self.addCleanup(pip_logger.setLevel, pip_logger.level)
+        pip_logger.setLevel(logging.INFO)
+        self.prepare_logger = logging.getLogger("pip._internal.operations.prepare")
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_adds_up_times_of_phases(self):
+        profiler = Profiler()
+
+        with patch("pip_install_privates.profiling.time.perf_counter", side_effect=[0, 1, 2, 5]):
+            with profiler.phase("collect"):
+                pass
+            with profiler.phase("collect"):
+                pass
+
+        self.assertEqual(profiler.phases["collect"]["calls"], 2)
+        self.assertEqual(profiler.phases["collect"]["wall_s"], 4)
+
+    def test_times_pip_activities_per_requirement(self):
+        profiler = Profiler()
+
+        with patch(
+            "pip_install_privates.profiling.time.perf_counter",
+            side_effect=[0, 1, 3, 4, 8, 9, 10, 10],
+        ):
+            with profiler.pip_phase("pip_install"):
+                log = self.prepare_logger.info
+                log("Collecting %s", "my_project@ git+https://github.com/MyOrg/my-project.git")
+                log("Cloning %s to %s", "https://****@github.com/MyOrg/my-project.git", "/tmp")
+                log("Building wheel for %s (pyproject.toml): started", "my_project")
+                log("Created wheel for %s: filename=%s", "my_project", "my_project.whl")
+                log("Installing collected packages: %s", "my_project")
+
+        self.assertEqual(
+            profiler.requirements,
+            {
+                "my_project": {"collect": 2, "build": 4},
+                "https://github.com/MyOrg/my-project.git": {"clone": 1},
+                "collected packages": {"install": 1},
+            },
+        )
+
+    def test_adds_up_sizes_of_downloads(self):
+        profiler = Profiler()
+
+        with profiler.pip_phase("pip_install"):
+            log = logging.getLogger("pip._internal.network.download").info
+            log("Downloading %s", "https://files.example.com/requests-2.31.0.tar.gz (1.5 MB)")
+            log("Downloading %s", "https://files.example.com/six-1.16.0.tar.gz (34 kB)")
+            log("Using cached %s", "https://files.example.com/idna-3.4.tar.gz (61 kB)")
+
+        self.assertEqual(profiler.downloaded_bytes, 1534000)
+
+    def test_ignores_pip_messages_outside_pip_phases(self):
+        profiler = Profiler()
+
+        self.prepare_logger.info("Collecting %s", "requests")
+
+        self.assertEqual(profiler.requirements, {})
+
+    def test_writes_json_report(self):
+        profiler = Profiler()
+        with profiler.phase("collect"):
+            pass
+
+        profiler.write_report(os.path.join(self.tmp, "report.json"))
+
+        with open(os.path.join(self.tmp, "report.json")) as f:
+            report = json.load(f)
+        self.assertEqual(
+            sorted(report["phases"]["collect"]), ["calls", "child_cpu_s", "cpu_s", "wall_s"]
+        )
+        self.assertIn("wall_s", report)
+
+    def test_profiles_phases_with_cprofile(self):
+        profiler = Profiler(cprofile=True)
+        with profiler.phase("collect"):
+            sorted(range(10))
+
+        profiler.dump_stats(os.path.join(self.tmp, "stats"))
+
+        functions = pstats.Stats(os.path.join(self.tmp, "stats")).stats
+        self.assertIn("<built-in method builtins.sorted>", [name for _, _, name in functions])
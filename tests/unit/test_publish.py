@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.publish import (
+    parse_wheel_filename,
+    publish_requirements,
+    write_simple_index,
+)
+
+
+class PublishTestCase(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.index_dir = os.path.join(self.tmp, "index")
+
+    def _create_wheel(self, name, directory=None):
+        path = os.path.join(directory or self.tmp, name)
+        with open(path, "w") as f:
+            f.write(name)
+        return path
+
+    def _read(self, *path):
+        with open(os.path.join(self.index_dir, *path)) as f:
+            return f.read()
+
+
+class TestParseWheelFilename(TestCase):
+
+    def test_returns_normalized_name_and_version(self):
+        self.assertEqual(
+            parse_wheel_filename("/wheels/My_Project-1.0.post1-py3-none-any.whl"),
+            ("my-project", "1.0.post1"),
+        )
+
+
+class TestWriteSimpleIndex(PublishTestCase):
+
+    def test_writes_project_pages_with_hashes(self):
+        wheel = self._create_wheel("my_project-1.0-py3-none-any.whl")
+
+        published = write_simple_index([wheel], self.index_dir)
+
+        self.assertEqual(
+            published,
+            [os.path.join(self.index_dir, "my-project", "my_project-1.0-py3-none-any.whl")],
+        )
+        digest = hashlib.sha256(b"my_project-1.0-py3-none-any.whl").hexdigest()
+        self.assertIn(
+            f'<a href="my_project-1.0-py3-none-any.whl#sha256={digest}">',
+            self._read("my-project", "index.html"),
+        )
+        self.assertIn('<a href="my-project/">my-project</a>', self._read("index.html"))
+
+    def test_keeps_wheels_published_before(self):
+        write_simple_index([self._create_wheel("my_project-1.0-py3-none-any.whl")], self.index_dir)
+
+        write_simple_index(
+            [
+                self._create_wheel("my_project-1.1-py3-none-any.whl"),
+                self._create_wheel("other-2.0-py3-none-any.whl"),
+            ],
+            self.index_dir,
+        )
+
+        project_page = self._read("my-project", "index.html")
+        self.assertIn("my_project-1.0-py3-none-any.whl", project_page)
+        self.assertIn("my_project-1.1-py3-none-any.whl", project_page)
+        self.assertIn('<a href="other/">other</a>', self._read("index.html"))
+
+
+class TestPublishRequirements(PublishTestCase):
+
+    def setUp(self):
+        super().setUp()
+        build_patcher = patch("pip_install_privates.publish.build_wheels_concurrently")
+        self.addCleanup(build_patcher.stop)
+        self.mock_build = build_patcher.start()
+        self.mock_build.side_effect = lambda requirements, wheelhouse, jobs: [
+            self._create_wheel("my_project-1.0-py3-none-any.whl", wheelhouse)
+        ]
+
+    def test_builds_git_requirements_without_markers(self):
+        publish_requirements(
+            [
+                "requests==2.31.0",
+                'git+https://github.com/MyOrg/my-project.git@v1.0#egg=my_project ; python_version>"3"',
+            ],
+            self.index_dir,
+            4,
+        )
+
+        self.assertEqual(
+            self.mock_build.call_args[0][0],
+            ["git+https://github.com/MyOrg/my-project.git@v1.0#egg=my_project"],
+        )
+        self.assertEqual(self.mock_build.call_args[0][2], 4)
+
+    def test_publishes_editable_git_requirements_as_regular_wheels(self):
+        publish_requirements(
+            ["-e", "git+https://github.com/MyOrg/my-project.git@v1.0#egg=my_project"],
+            self.index_dir,
+        )
+
+        self.assertEqual(
+            self.mock_build.call_args[0][0],
+            ["git+https://github.com/MyOrg/my-project.git@v1.0#egg=my_project"],
+        )
+        self.assertEqual(self._read("requirements.txt"), "my-project==1.0\n")
+
+    def test_writes_requirements_pinned_by_name_and_version(self):
+        publish_requirements(
+            ['git+https://github.com/MyOrg/my-project.git@v1.0 ; python_version>"3"'],
+            self.index_dir,
+        )
+
+        self.assertEqual(
+            self._read("requirements.txt"), 'my-project==1.0 ; python_version>"3"\n'
+        )
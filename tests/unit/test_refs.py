@@ -0,0 +1,121 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.refs import RefCache, pin_refs
+from tests.unit.helpers import create_bare_repository, git
+
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+
+
+class TestRefCache(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache", "refs.json")
+
+    def test_get_returns_commit_that_was_set(self):
+        cache = RefCache(self.path)
+        cache.set("https://github.com/MyOrg/repo.git", "main", COMMIT)
+
+        self.assertEqual(cache.get("https://github.com/MyOrg/repo.git", "main"), COMMIT)
+        self.assertIsNone(cache.get("https://github.com/MyOrg/repo.git", "develop"))
+
+    def test_get_returns_none_for_expired_entries(self):
+        cache = RefCache(self.path, ttl=60)
+        with patch("pip_install_privates.refs.time.time", return_value=1000):
+            cache.set("https://github.com/MyOrg/repo.git", "main", COMMIT)
+        with patch("pip_install_privates.refs.time.time", return_value=1061):
+            self.assertIsNone(cache.get("https://github.com/MyOrg/repo.git", "main"))
+
+    def test_saved_entries_are_loaded_without_credentials(self):
+        cache = RefCache(self.path)
+        cache.set("https://my-token@github.com/MyOrg/repo.git", "main", COMMIT)
+        cache.save()
+
+        with open(self.path) as f:
+            self.assertNotIn("my-token", f.read())
+        self.assertEqual(
+            RefCache(self.path).get("https://other-token@github.com/MyOrg/repo.git", "main"),
+            COMMIT,
+        )
+
+
+class TestPinRefs(TestCase):
+
+    def test_pins_branches_and_tags_to_commits(self):
+        bare1, work1 = create_bare_repository(self)
+        bare2, work2 = create_bare_repository(self)
+        git("tag", "-a", "-m", "v1", "v1", cwd=work2)
+        git("push", "--quiet", "--tags", "origin", cwd=work2)
+
+        ret = pin_refs(
+            [
+                "mock==2.0.0",
+                f'git+file://{bare1}@main#egg=project1 ; python_version>"3"',
+                f"git+file://{bare2}@v1#egg=project2",
+                f"git+file://{bare2}",
+            ],
+            jobs=2,
+        )
+
+        commit1 = git("rev-parse", "HEAD", cwd=work1)
+        commit2 = git("rev-parse", "HEAD", cwd=work2)
+        self.assertEqual(
+            ret,
+            [
+                "mock==2.0.0",
+                f'git+file://{bare1}@{commit1}#egg=project1 ; python_version>"3"',
+                f"git+file://{bare2}@{commit2}#egg=project2",
+                f"git+file://{bare2}@{commit2}",
+            ],
+        )
+
+    def test_pins_refs_of_direct_references(self):
+        bare, work = create_bare_repository(self)
+
+        ret = pin_refs([f'project @ git+file://{bare}@main ; python_version>"3"'])
+
+        commit = git("rev-parse", "HEAD", cwd=work)
+        self.assertEqual(ret, [f'project @ git+file://{bare}@{commit} ; python_version>"3"'])
+
+    def test_leaves_commits_unknown_refs_and_editables_alone(self):
+        bare, _ = create_bare_repository(self)
+        requirements = [
+            f"git+file://{bare}@{COMMIT}#egg=project",
+            f"git+file://{bare}@does-not-exist#egg=project",
+            "-e",
+            f"git+file://{bare}@main#egg=project",
+        ]
+
+        self.assertEqual(pin_refs(requirements), requirements)
+
+    def test_raises_error_for_unreachable_repository(self):
+        with self.assertRaises(RuntimeError):
+            pin_refs(["git+file:///does/not/exist.git@main"])
+
+    def test_uses_cached_commits(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = RefCache(os.path.join(tmp.name, "refs.json"))
+        cache.set("https://github.com/MyOrg/repo.git", "main", COMMIT)
+
+        with patch("pip_install_privates.refs.resolve_commits") as mock_resolve:
+            ret = pin_refs(["git+https://github.com/MyOrg/repo.git@main#egg=repo"], cache)
+
+        self.assertFalse(mock_resolve.called)
+        self.assertEqual(ret, [f"git+https://github.com/MyOrg/repo.git@{COMMIT}#egg=repo"])
+
+    def test_caches_resolved_commits(self):
+        bare, work = create_bare_repository(self)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "refs.json")
+
+        pin_refs([f"git+file://{bare}@main"], RefCache(path))
+
+        self.assertEqual(
+            RefCache(path).get(f"file://{bare}", "main"), git("rev-parse", "HEAD", cwd=work)
+        )
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.remote_cache import (
+    DirectoryBackend,
+    HttpBackend,
+    open_remote_cache,
+)
+from pip_install_privates.wheels import WheelCache
+
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+URL = "https://github.com/MyOrg/my-project.git"
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    files = {}
+    authorizations = []
+
+    def do_GET(self):
+        self.authorizations.append(self.headers.get("Authorization"))
+        if self.path not in self.files:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(self.files[self.path])
+
+    def do_PUT(self):
+        self.authorizations.append(self.headers.get("Authorization"))
+        self.files[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(201)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class RemoteCacheTestCase(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def _create_wheel(self, name="my_project-1.0-py3-none-any.whl"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as f:
+            f.write("wheel")
+        return path
+
+    def _assert_shared_between_runners(self, remote):
+        runner = WheelCache(os.path.join(self.tmp, "runner-1"), remote)
+        runner.store(URL, COMMIT, self._create_wheel())
+        other_runner = WheelCache(os.path.join(self.tmp, "runner-2"), remote)
+
+        wheel = other_runner.lookup(URL, COMMIT)
+
+        self.assertTrue(wheel.startswith(os.path.join(self.tmp, "runner-2")))
+        self.assertEqual(os.path.basename(wheel), "my_project-1.0-py3-none-any.whl")
+        with open(wheel) as f:
+            self.assertEqual(f.read(), "wheel")
+
+
+class TestDirectoryBackend(RemoteCacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.remote = DirectoryBackend(os.path.join(self.tmp, "shared"))
+
+    def test_fetch_returns_none_if_not_cached(self):
+        self.assertIsNone(self.remote.fetch("repo/commit/tag", self.tmp))
+
+    def test_shares_wheels_between_runners(self):
+        self._assert_shared_between_runners(self.remote)
+
+    def test_misses_for_other_commit(self):
+        WheelCache(os.path.join(self.tmp, "runner-1"), self.remote).store(
+            URL, COMMIT, self._create_wheel()
+        )
+
+        self.assertIsNone(
+            WheelCache(os.path.join(self.tmp, "runner-2"), self.remote).lookup(URL, "f" * 40)
+        )
+
+
+class TestHttpBackend(RemoteCacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        StoreHandler.files = {}
+        StoreHandler.authorizations = []
+        self.server = HTTPServer(("127.0.0.1", 0), StoreHandler)
+        self.addCleanup(self.server.server_close)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+        self.remote = HttpBackend(f"http://127.0.0.1:{self.server.server_port}/cache/")
+
+    def test_fetch_returns_none_if_not_cached(self):
+        self.assertIsNone(self.remote.fetch("repo/commit/tag", self.tmp))
+
+    def test_shares_wheels_between_runners(self):
+        self._assert_shared_between_runners(self.remote)
+
+    def test_uploads_index_after_wheel(self):
+        self.remote.upload("repo/commit/tag", self._create_wheel())
+
+        self.assertEqual(
+            list(StoreHandler.files),
+            [
+                "/cache/repo/commit/tag/my_project-1.0-py3-none-any.whl",
+                "/cache/repo/commit/tag/index.json",
+            ],
+        )
+
+    def test_sends_token_as_bearer_token(self):
+        with patch.dict(os.environ, {"PIP_INSTALL_PRIVATES_REMOTE_CACHE_TOKEN": "my-token"}):
+            self.remote.fetch("repo/commit/tag", self.tmp)
+
+        self.assertEqual(StoreHandler.authorizations, ["Bearer my-token"])
+
+    def test_unreachable_remote_is_a_cache_miss(self):
+        cache = WheelCache(os.path.join(self.tmp, "runner"), HttpBackend("http://127.0.0.1:1"))
+
+        self.assertIsNone(cache.lookup(URL, COMMIT))
+        self.assertTrue(cache.store(URL, COMMIT, self._create_wheel()))
+
+
+class TestOpenRemoteCache(TestCase):
+
+    def test_opens_http_backend_for_urls(self):
+        self.assertIsInstance(open_remote_cache("https://cache.example.com/wheels"), HttpBackend)
+
+    def test_opens_directory_backend_for_paths(self):
+        self.assertIsInstance(open_remote_cache("/mnt/shared/wheels"), DirectoryBackend)
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+from importlib import metadata
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_install_privates.satisfied import drop_satisfied, iter_requirement_indexes
+from tests.unit.helpers import commit_files, create_bare_repository, git
+
+
+class TestDropSatisfied(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.site_packages = tmp.name
+        distributions = metadata.distributions
+        patcher = patch(
+            "importlib.metadata.distributions",
+            lambda: distributions(path=[self.site_packages]),
+        )
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def _install(self, name, version, direct_url=None):
+        dist_info = os.path.join(self.site_packages, f"{name}-{version}.dist-info")
+        os.mkdir(dist_info)
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+        if direct_url:
+            with open(os.path.join(dist_info, "direct_url.json"), "w") as f:
+                json.dump(direct_url, f)
+
+    def _install_from_git(self, name, url, commit):
+        self._install(
+            name,
+            "1.0",
+            {"url": url, "vcs_info": {"vcs": "git", "commit_id": commit}},
+        )
+
+    def test_drops_requirements_with_matching_version(self):
+        self._install("mock", "2.0.0")
+        self._install("Django", "1.10")
+
+        ret = drop_satisfied(["mock==2.0.0", "django>=1.8", "requests==2.0"])
+
+        self.assertEqual(ret, ["requests==2.0"])
+
+    def test_keeps_requirements_with_other_version(self):
+        self._install("mock", "1.0.0")
+
+        self.assertEqual(drop_satisfied(["mock==2.0.0"]), ["mock==2.0.0"])
+
+    def test_drops_requirements_for_other_environments(self):
+        ret = drop_satisfied(['mock==2.0.0 ; python_version<"3"'])
+
+        self.assertEqual(ret, [])
+
+    def test_keeps_requirements_with_extras_and_hashes(self):
+        self._install("mock", "2.0.0")
+        requirements = ["mock[extra]==2.0.0", "mock==2.0.0", "--hash=sha256:abcd"]
+
+        self.assertEqual(drop_satisfied(requirements), requirements)
+
+    def test_drops_git_requirement_installed_from_current_commit(self):
+        bare, work = create_bare_repository(self)
+        self._install_from_git(
+            "my_project", f"file://{bare}", git("rev-parse", "HEAD", cwd=work)
+        )
+
+        ret = drop_satisfied([f"git+file://{bare}@main#egg=my-project"])
+
+        self.assertEqual(ret, [])
+
+    def test_keeps_git_requirement_whose_ref_moved(self):
+        bare, work = create_bare_repository(self)
+        self._install_from_git(
+            "my_project", f"file://{bare}", git("rev-parse", "HEAD", cwd=work)
+        )
+        commit_files(work, {"README": "changed\n"})
+
+        ret = drop_satisfied([f"git+file://{bare}@main#egg=my_project"])
+
+        self.assertEqual(ret, [f"git+file://{bare}@main#egg=my_project"])
+
+    def test_keeps_git_requirement_installed_from_other_repository(self):
+        commit = "0123456789abcdef0123456789abcdef01234567"
+        self._install_from_git(
+            "my_project", "https://github.com/MyOrg/fork.git", commit
+        )
+        requirement = f"git+https://github.com/MyOrg/my-project.git@{commit}#egg=my_project"
+
+        self.assertEqual(drop_satisfied([requirement]), [requirement])
+
+    def test_drops_git_requirement_installed_from_mirror_at_commit_in_manifest(self):
+        commit = "0123456789abcdef0123456789abcdef01234567"
+        self._install_from_git("my_project", "file:///cache/mirrors/0123456789abcdef.git", commit)
+        requirement = f"git+https://github.com/MyOrg/my-project.git@{commit}#egg=my_project"
+        manifest = {"my-project": {"requirement": requirement, "version": "1.0", "commit": commit}}
+
+        self.assertEqual(drop_satisfied([requirement], manifest=manifest), [])
+
+    def test_keeps_git_requirement_whose_manifest_entry_is_outdated(self):
+        commit = "0123456789abcdef0123456789abcdef01234567"
+        self._install_from_git("my_project", "file:///cache/mirrors/0123456789abcdef.git", commit)
+        requirement = f"git+https://github.com/MyOrg/my-project.git@{commit}#egg=my_project"
+        manifest = {"my-project": {"requirement": requirement, "version": "0.9", "commit": commit}}
+
+        self.assertEqual(drop_satisfied([requirement], manifest=manifest), [requirement])
+
+    def test_keeps_editable_requirements(self):
+        commit = "0123456789abcdef0123456789abcdef01234567"
+        self._install_from_git(
+            "my_project", "https://github.com/MyOrg/my-project.git", commit
+        )
+        requirements = [
+            "-e",
+            f"git+https://github.com/MyOrg/my-project.git@{commit}#egg=my_project",
+        ]
+
+        self.assertEqual(drop_satisfied(requirements), requirements)
+
+    def test_iter_requirement_indexes_skips_options_and_their_values(self):
+        requirements = [
+            "--index-url",
+            "https://pypi.example.com/simple",
+            "mock==2.0.0",
+            "--hash=sha256:abcd",
+            "-e",
+            "git+https://github.com/MyOrg/my-project.git",
+        ]
+
+        self.assertEqual(list(iter_requirement_indexes(requirements)), [2, 5])
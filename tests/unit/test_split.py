@@ -0,0 +1,99 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from pip_install_privates.split import (
+    is_public_requirement,
+    split_requirements,
+    write_requirements_file,
+)
+
+
+class TestIsPublicRequirement(TestCase):
+
+    def test_requirements_by_name_are_public(self):
+        self.assertTrue(is_public_requirement("requests==2.31.0"))
+        self.assertTrue(is_public_requirement('requests ; python_version>"3"'))
+
+    def test_git_requirements_urls_and_paths_are_private(self):
+        self.assertFalse(
+            is_public_requirement("git+https://github.com/MyOrg/my-project.git@v1#egg=my_project")
+        )
+        self.assertFalse(
+            is_public_requirement("my_project @ https://example.com/my_project-1.0.tar.gz")
+        )
+        self.assertFalse(is_public_requirement("./vendor/my_project"))
+
+
+class TestSplitRequirements(TestCase):
+
+    def test_splits_public_and_private_requirements(self):
+        public, private = split_requirements(
+            [
+                "requests==2.31.0",
+                "git+https://github.com/MyOrg/my-project.git@v1#egg=my_project",
+                "-e",
+                "git+https://github.com/MyOrg/other.git#egg=other",
+                "django",
+            ]
+        )
+
+        self.assertEqual(public, ["requests==2.31.0", "django"])
+        self.assertEqual(
+            private,
+            [
+                "git+https://github.com/MyOrg/my-project.git@v1#egg=my_project",
+                "-e",
+                "git+https://github.com/MyOrg/other.git#egg=other",
+            ],
+        )
+
+    def test_keeps_options_in_both_and_hashes_with_their_requirement(self):
+        public, private = split_requirements(
+            [
+                "--index-url",
+                "https://pypi.example.com/simple",
+                "requests==2.31.0",
+                "--hash=sha256:abc",
+                "git+https://github.com/MyOrg/my-project.git@v1#egg=my_project",
+            ]
+        )
+
+        self.assertEqual(
+            public,
+            ["--index-url", "https://pypi.example.com/simple", "requests==2.31.0", "--hash=sha256:abc"],
+        )
+        self.assertEqual(
+            private,
+            [
+                "--index-url",
+                "https://pypi.example.com/simple",
+                "git+https://github.com/MyOrg/my-project.git@v1#egg=my_project",
+            ],
+        )
+
+
+class TestWriteRequirementsFile(TestCase):
+
+    def test_writes_one_requirement_per_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "private.txt")
+            write_requirements_file(
+                [
+                    "--index-url",
+                    "https://pypi.example.com/simple",
+                    "requests==2.31.0",
+                    "--hash=sha256:abc",
+                    "-e",
+                    'git+https://github.com/MyOrg/other.git#egg=other ; python_version>"3"',
+                ],
+                fname,
+            )
+
+            with open(fname) as f:
+                self.assertEqual(
+                    f.read(),
+                    "--index-url https://pypi.example.com/simple\n"
+                    "requests==2.31.0 --hash=sha256:abc\n"
+                    "-e 'git+https://github.com/MyOrg/other.git#egg=other ; python_version>\"3\"'\n",
+                )